@@ -0,0 +1,228 @@
+"""
+Cold storage for completed matches in per-season SQLite files.
+
+archive_matches() moves completed matches older than a cutoff, with their
+innings, deliveries and scorecards, out of the live database into
+<directory>/matches_<season>.db, where the season is the year of the match
+date. The live file that takes ball-by-ball writes then only holds current
+matches, so its pages stay in cache and it stays cheap to back up.
+
+MatchArchive.attach() runs on every pooled connection: it ATTACHes the
+season files (newest first, up to SQLite's attached-database limit) and
+creates temporary views archived_<table> over all of them. Read paths that
+should include history query those views next to the live tables; with no
+archive files the views are empty. Archived matches are read-only.
+
+Rows are copied and deleted in one transaction. Because that transaction
+spans two files it is atomic per file only, so readers exclude archived
+rows whose id is still present in the live database, and a re-run after a
+crash copies them again with INSERT OR REPLACE.
+"""
+import datetime as dt
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Tables moved with a match: (table, column holding the match id)
+ARCHIVED_TABLES = (
+    ('matches', 'id'),
+    ('match_innings', 'match_id'),
+    ('ball_by_ball', 'match_id'),
+    ('ball_commentary', 'match_id'),
+    ('batting_scorecard', 'match_id'),
+    ('bowling_scorecard', 'match_id'),
+)
+ARCHIVE_FILE = re.compile(r'^matches_(\d{4})\.db$')
+# Matches moved per transaction, so the live write lock is held briefly
+ARCHIVE_BATCH = 200
+
+
+def with_archived(table, key):
+    """FROM clause over live rows plus archived rows not also still live"""
+    return (f'(SELECT * FROM main.{table} UNION ALL '
+            f'SELECT * FROM archived_{table} WHERE {key} NOT IN '
+            f'(SELECT {key} FROM main.{table}))')
+
+
+def _columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+
+def _season(match_date, created_at):
+    return str(match_date or created_at)[:4]
+
+
+def create_archive_schema(conn, schema):
+    """Create the archived tables and their indexes in an attached database"""
+    objects = conn.execute(f'''
+        SELECT type, name, tbl_name, sql FROM main.sqlite_master
+        WHERE tbl_name IN ({', '.join('?' * len(ARCHIVED_TABLES))}) AND sql IS NOT NULL
+          AND type IN ('table', 'index')
+        ORDER BY type DESC
+    ''', [table for table, _ in ARCHIVED_TABLES]).fetchall()
+    for kind, name, table, sql in objects:
+        # sqlite_master stores "CREATE [UNIQUE] INDEX name" / "CREATE TABLE name"
+        sql = re.sub(r'^CREATE (UNIQUE INDEX|INDEX|TABLE) ',
+                     rf'CREATE \1 IF NOT EXISTS {schema}.', sql, count=1)
+        conn.execute(sql)
+        if kind == 'table':
+            # Columns added to the live table after this archive was created
+            existing = set(_columns(conn, schema, table))
+            for row in conn.execute(f'PRAGMA main.table_info({table})').fetchall():
+                if row[1] not in existing:
+                    conn.execute(f'ALTER TABLE {schema}.{table} ADD COLUMN {row[1]} {row[2]}')
+
+
+def archive_matches(database, directory, older_than_days, today=None):
+    """Move old completed matches into season files; returns {season: count}"""
+    cutoff = (today or dt.date.today()) - dt.timedelta(days=older_than_days)
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(database, timeout=30)
+    moved = {}
+    try:
+        candidates = conn.execute('''
+            SELECT id, match_date, created_at FROM matches
+            WHERE status = 'Completed' AND COALESCE(match_date, date(created_at)) < ?
+            ORDER BY id
+        ''', (cutoff.isoformat(),)).fetchall()
+        seasons = {}
+        for match_id, match_date, created_at in candidates:
+            seasons.setdefault(_season(match_date, created_at), []).append(match_id)
+
+        for season, ids in sorted(seasons.items()):
+            conn.execute('ATTACH DATABASE ? AS archive_target',
+                         (os.path.join(directory, f'matches_{season}.db'),))
+            try:
+                for start in range(0, len(ids), ARCHIVE_BATCH):
+                    batch = ids[start:start + ARCHIVE_BATCH]
+                    conn.execute('BEGIN IMMEDIATE')
+                    try:
+                        # Re-check under the write lock in case a match changed since
+                        batch = [row[0] for row in conn.execute(f'''
+                            SELECT id FROM matches
+                            WHERE id IN ({', '.join('?' * len(batch))}) AND status = 'Completed'
+                        ''', batch)]
+                        marks = ', '.join('?' * len(batch))
+                        create_archive_schema(conn, 'archive_target')
+                        for table, key in ARCHIVED_TABLES:
+                            columns = ', '.join(_columns(conn, 'main', table))
+                            conn.execute(f'''
+                                INSERT OR REPLACE INTO archive_target.{table} ({columns})
+                                SELECT {columns} FROM main.{table} WHERE {key} IN ({marks})
+                            ''', batch)
+                            conn.execute(f'DELETE FROM main.{table} WHERE {key} IN ({marks})',
+                                         batch)
+                        conn.commit()
+                    except BaseException:
+                        conn.rollback()
+                        raise
+                    moved[season] = moved.get(season, 0) + len(batch)
+            finally:
+                conn.execute('DETACH DATABASE archive_target')
+    finally:
+        conn.close()
+    return moved
+
+
+class MatchArchive:
+    """Keeps pooled connections attached to the current season files"""
+
+    def __init__(self, directory, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._seasons = ()
+        self._listed_at = None
+        self._stats = {'attaches': 0, 'detaches': 0, 'errors': 0, 'not_attached': 0}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def path(self, season):
+        return os.path.join(self.directory, f'matches_{season}.db')
+
+    def seasons(self):
+        """Archived seasons, newest first; re-listed at most every check_interval"""
+        now = time.monotonic()
+        with self._lock:
+            if self._listed_at is None or now - self._listed_at >= self.check_interval:
+                try:
+                    names = os.listdir(self.directory)
+                except FileNotFoundError:
+                    names = []
+                self._seasons = tuple(sorted(
+                    (match.group(1) for match in map(ARCHIVE_FILE.match, names) if match),
+                    reverse=True))
+                self._listed_at = now
+            return self._seasons
+
+    def refresh(self):
+        """Re-list the directory on the next attach, e.g. right after archiving"""
+        with self._lock:
+            self._listed_at = None
+
+    def attach(self, conn):
+        """Attach the season files to conn and rebuild the archived_ views"""
+        seasons = self.seasons()
+        # Oldest seasons beyond the attach limit stay on disk but unread
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(seasons) > limit:
+            self._stats['not_attached'] = len(seasons) - limit
+            seasons = seasons[:limit]
+        if getattr(conn, 'archive_seasons', None) == seasons:
+            return
+        try:
+            attached = {row[1] for row in conn.execute('PRAGMA database_list')}
+            for schema in attached:
+                if schema.startswith('season_') and schema[7:] not in seasons:
+                    conn.execute(f'DETACH DATABASE {schema}')
+                    self._stats['detaches'] += 1
+            for season in seasons:
+                if f'season_{season}' not in attached:
+                    conn.execute(f'ATTACH DATABASE ? AS season_{season}', (self.path(season),))
+                    self._stats['attaches'] += 1
+            complete = True
+            for table, _ in ARCHIVED_TABLES:
+                conn.execute(f'DROP VIEW IF EXISTS temp.archived_{table}')
+                view_sql = self._view_sql(conn, table, seasons)
+                if view_sql is None:
+                    # Live schema not migrated yet; try again on the next acquire
+                    complete = False
+                    continue
+                conn.execute(f'CREATE TEMP VIEW archived_{table} AS {view_sql}')
+        except sqlite3.Error:
+            self._stats['errors'] += 1
+            raise
+        if complete:
+            conn.archive_seasons = seasons
+
+    @staticmethod
+    def _view_sql(conn, table, seasons):
+        """UNION ALL over every season in the live table's column order, or None"""
+        columns = _columns(conn, 'main', table)
+        if not columns:
+            return None
+        selects = []
+        for season in seasons:
+            available = set(_columns(conn, f'season_{season}', table))
+            if not available:
+                continue
+            selects.append('SELECT ' + ', '.join(
+                column if column in available else f'NULL AS {column}' for column in columns
+            ) + f' FROM season_{season}.{table}')
+        return ' UNION ALL '.join(selects) or \
+            f"SELECT {', '.join(columns)} FROM main.{table} WHERE 0"
+
+    def stats(self):
+        """Return archive files and attach counters for monitoring"""
+        seasons = self.seasons()
+        stats = dict(self._stats)
+        stats.update(directory=self.directory, seasons=list(seasons),
+                     bytes=sum(os.path.getsize(self.path(season)) for season in seasons
+                               if os.path.exists(self.path(season))))
+        return stats
@@ -0,0 +1,219 @@
+"""
+Online hot backups of the SQLite database to a persistent, compressed file.
+
+The live database sits on ephemeral storage (/tmp on Render), so a restart
+loses it. DatabaseBackup copies it with the sqlite online backup API a few
+pages per step, pausing between steps so the copy never holds a lock for
+long. In WAL mode the source connection holds one read transaction for the
+whole copy: writers keep committing to the WAL, and the backup reads a
+single consistent snapshot instead of restarting after every write from
+another connection. Without WAL a write mid-copy restarts the backup, and
+a run is abandoned after max_restarts so a busy database is retried on the
+next interval rather than copied forever. The finished copy is
+gzip-compressed next to the target path and moved into place with
+os.replace().
+
+restore_database() runs at boot before any connection is opened: when the
+live database is missing or empty it decompresses the latest backup in
+its place.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+COPY_CHUNK = 1024 * 1024
+
+
+class BackupAbandoned(Exception):
+    """The source kept changing faster than the backup could finish"""
+
+
+def database_is_empty(database):
+    """True if the database file is missing or holds no schema"""
+    if not os.path.exists(database) or os.path.getsize(database) == 0:
+        return True
+    conn = sqlite3.connect(f'file:{database}?mode=ro', uri=True)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def backup_database(source, path, pages=256, step_pause=0.005, max_restarts=5,
+                    compresslevel=6):
+    """Copy the source connection into a gzip file at path; returns stats"""
+    started = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    progress = {'steps': 0, 'restarts': 0, 'remaining': None, 'total': 0}
+
+    def on_step(status, remaining, total):
+        # remaining grows again when a concurrent write restarted the copy
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > max_restarts:
+                raise BackupAbandoned(f'source changed {progress["restarts"]} times mid-copy')
+        progress.update(steps=progress['steps'] + 1, remaining=remaining, total=total)
+        if remaining and step_pause:
+            time.sleep(step_pause)
+
+    with tempfile.TemporaryDirectory(dir=directory) as scratch:
+        copy_path = os.path.join(scratch, 'backup.db')
+        copy = sqlite3.connect(copy_path)
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+        try:
+            if wal:
+                # Pin a snapshot; WAL readers never block writers
+                source.execute('BEGIN')
+                source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            source.backup(copy, pages=pages, progress=on_step)
+        finally:
+            if wal:
+                source.rollback()
+            copy.close()
+        copied_ms = (time.perf_counter() - started) * 1000
+
+        tmp_path = os.path.join(scratch, 'backup.db.gz')
+        with open(copy_path, 'rb') as raw, open(tmp_path, 'wb') as out:
+            with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=compresslevel,
+                               mtime=0) as compressed:
+                shutil.copyfileobj(raw, compressed, COPY_CHUNK)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+        size = os.path.getsize(copy_path)
+
+    return {
+        'pages': progress['total'],
+        'steps': progress['steps'],
+        'restarts': progress['restarts'],
+        'bytes': size,
+        'compressed_bytes': os.path.getsize(path),
+        'copy_ms': round(copied_ms, 3),
+        'total_ms': round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def restore_database(path, database):
+    """Replace a missing or empty database with the backup at path
+
+    Returns the restore time in milliseconds, or None if nothing was
+    restored. Must run before connections to database are opened.
+    """
+    if not os.path.exists(path) or not database_is_empty(database):
+        return None
+    started = time.perf_counter()
+    tmp_path = f'{database}.{os.getpid()}.restore'
+    try:
+        with gzip.open(path, 'rb') as compressed, open(tmp_path, 'wb') as out:
+            shutil.copyfileobj(compressed, out, COPY_CHUNK)
+        check = sqlite3.connect(tmp_path)
+        try:
+            result = check.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            check.close()
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f'{path} failed quick_check: {result}')
+        # WAL files from the empty database must not be applied to the restored one
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.unlink(database + suffix)
+        os.replace(tmp_path, database)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def changed_since(database, timestamp_ns):
+    for db_file in (database, database + '-wal'):
+        try:
+            if os.stat(db_file).st_mtime_ns > timestamp_ns:
+                return True
+        except FileNotFoundError:
+            pass
+    return False
+
+
+class DatabaseBackup:
+    """Periodic background backups of a pooled database"""
+
+    def __init__(self, pool, path, interval=300.0, pages=256, step_pause=0.005):
+        self.pool = pool
+        self.path = path
+        self.interval = interval
+        self.pages = pages
+        self.step_pause = step_pause
+        self._reset()
+        self._copy_started_ns = None
+        self._stats = {'backups': 0, 'skipped': 0, 'abandoned': 0, 'errors': 0,
+                       'last_backup': None, 'restore_ms': None}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Also runs after fork: the backup thread stays with the parent
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def restore(self):
+        """Restore the latest backup if the live database is empty"""
+        restore_ms = restore_database(self.path, self.pool.database)
+        if restore_ms is not None:
+            # Idle connections still point at the replaced file
+            self.pool.close_all()
+            self._stats['restore_ms'] = restore_ms
+        return restore_ms
+
+    def backup(self, force=True):
+        """Back up now; without force, skip if nothing changed since the last backup"""
+        with self._lock:
+            if not force and self._copy_started_ns is not None and \
+                    not changed_since(self.pool.database, self._copy_started_ns):
+                self._stats['skipped'] += 1
+                return None
+            copy_started_ns = time.time_ns()
+            try:
+                with self.pool.connection() as conn:
+                    result = backup_database(conn, self.path, self.pages, self.step_pause)
+            except BackupAbandoned:
+                self._stats['abandoned'] += 1
+                raise
+            except Exception:
+                self._stats['errors'] += 1
+                raise
+            self._copy_started_ns = copy_started_ns
+            self._stats['backups'] += 1
+            self._stats['last_backup'] = dict(result, at=time.time())
+            return result
+
+    def start(self):
+        """Back up every interval seconds on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.backup(force=False)
+                except Exception:
+                    pass
+
+        self._thread = threading.Thread(target=run, name='database-backup', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        """Return backup counters for monitoring"""
+        stats = dict(self._stats)
+        stats.update(path=self.path, interval=self.interval, running=self._thread is not None)
+        return stats
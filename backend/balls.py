@@ -0,0 +1,81 @@
+"""
+Ball-by-ball delivery storage.
+
+ball_by_ball is an append-only WITHOUT ROWID table clustered on
+(match_id, innings_number, over_number, ball_number), so a re-sent delivery
+is ignored by INSERT OR IGNORE and a match's balls are stored contiguously
+in delivery order. The table and ball_commentary are created by the schema
+migrations (migrations.py).
+
+extras_type says what the extras were ('wide', 'noball', 'bye' or
+'legbye'), which decides whether the delivery counts as a ball and whether
+its extras are charged to the bowler. Deliveries sent without one are
+scored as a legal ball with the extras charged to the bowler.
+"""
+
+BALL_FIELDS = ('innings_number', 'over_number', 'ball_number', 'batsman_id', 'bowler_id',
+               'runs_scored', 'extras', 'extras_type', 'wicket_type', 'wicket_player_id',
+               'commentary')
+EXTRAS_TYPES = ('wide', 'noball', 'bye', 'legbye')
+REQUIRED_BALL_FIELDS = ('innings_number', 'over_number', 'ball_number')
+OPTIONAL_ID_FIELDS = ('batsman_id', 'bowler_id', 'wicket_player_id')
+
+
+def normalize_ball(match_id, ball):
+    """Validate one delivery payload and return its insert parameters"""
+    if not isinstance(ball, dict):
+        raise ValueError('Each ball must be an object')
+    for field in REQUIRED_BALL_FIELDS:
+        if ball.get(field) is None:
+            raise ValueError(f'{field} is required')
+
+    innings_number = int(ball['innings_number'])
+    over_number = int(ball['over_number'])
+    ball_number = int(ball['ball_number'])
+    runs_scored = int(ball.get('runs_scored', 0))
+    extras = int(ball.get('extras', 0))
+    if innings_number < 1 or over_number < 0 or ball_number < 1:
+        raise ValueError('innings_number and ball_number start at 1, over_number at 0')
+    if runs_scored < 0 or extras < 0:
+        raise ValueError('runs_scored and extras cannot be negative')
+    extras_type = ball.get('extras_type') or None
+    if extras_type is not None:
+        if extras_type not in EXTRAS_TYPES:
+            raise ValueError(f"extras_type must be one of {', '.join(EXTRAS_TYPES)}")
+        if extras_type == 'wide' and runs_scored:
+            raise ValueError('A wide cannot have runs_scored off the bat')
+
+    ids = [int(ball[field]) if ball.get(field) is not None else None
+           for field in OPTIONAL_ID_FIELDS]
+    commentary = ball.get('commentary')
+    if commentary is not None and not isinstance(commentary, str):
+        raise ValueError('commentary must be a string')
+    return (match_id, innings_number, over_number, ball_number, ids[0], ids[1],
+            runs_scored, extras, extras_type, ball.get('wicket_type') or None, ids[2],
+            commentary.strip() if commentary and commentary.strip() else None)
+
+
+def insert_balls(conn, rows):
+    """Insert normalized deliveries, ignoring duplicates; returns rows inserted"""
+    # rowcount counts ball_by_ball rows only, not the scorecard rows the
+    # trigger writes (total_changes would include those)
+    cursor = conn.executemany('''
+        INSERT OR IGNORE INTO ball_by_ball (
+            match_id, innings_number, over_number, ball_number, batsman_id, bowler_id,
+            runs_scored, extras, extras_type, wicket_type, wicket_player_id
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [row[:11] for row in rows])
+    inserted = cursor.rowcount
+    # Commentary of a re-sent delivery is ignored like the delivery itself
+    conn.executemany('''
+        INSERT OR IGNORE INTO ball_commentary (
+            match_id, innings_number, over_number, ball_number, commentary
+        ) VALUES (?, ?, ?, ?, ?)
+    ''', [row[:4] + row[11:] for row in rows if row[11] is not None])
+    return inserted
+
+
+def delete_match_balls(conn, match_id):
+    """Remove every delivery of a deleted match"""
+    conn.execute('DELETE FROM ball_by_ball WHERE match_id = ?', (match_id,))
+    conn.execute('DELETE FROM ball_commentary WHERE match_id = ?', (match_id,))
@@ -0,0 +1,323 @@
+"""
+Optional NumPy column store for player analytics.
+
+Player stats are held as parallel NumPy arrays (runs, balls, fours, sixes,
+strike_rate and an integer team code) so leaderboards, team group-bys,
+percentiles and filtered rankings run as vectorized operations instead of
+row-at-a-time SQL. The write path updates single slots in place; deleted
+players are masked out until the next full load. Like the leaderboard, the
+store is treated as stale after max_age seconds (writes from other gunicorn
+workers are not seen) and queries return None so callers fall back to SQL.
+
+NumPy is optional: when it is not installed AVAILABLE is False and the
+store stays empty.
+"""
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+AVAILABLE = np is not None
+
+NUMERIC_COLUMNS = ('runs', 'balls', 'fours', 'sixes', 'strike_rate')
+RANKABLE_COLUMNS = NUMERIC_COLUMNS
+
+_DTYPES = {
+    'id': 'int64',
+    'runs': 'int64',
+    'balls': 'int64',
+    'fours': 'int64',
+    'sixes': 'int64',
+    'strike_rate': 'float64',
+    'team_code': 'int32',
+    'alive': 'bool',
+}
+
+
+class _ColumnData:
+    """Player columns and the slot, name and team lookups beside them
+
+    load() fills a bare instance off-lock and then swaps its fields into the
+    store, so building one registers no fork hook.
+    """
+
+    def __init__(self, initial_capacity=1024):
+        self._initial_capacity = initial_capacity
+        self._clear()
+
+    def _clear(self):
+        capacity = self._initial_capacity
+        self._columns = {name: np.zeros(capacity, dtype=dtype)
+                         for name, dtype in _DTYPES.items()} if AVAILABLE else {}
+        self._names = []
+        self._size = 0
+        self._slots = {}
+        self._team_codes = {}
+        self._teams = []
+
+    def _team_code(self, team):
+        code = self._team_codes.get(team)
+        if code is None:
+            code = self._team_codes[team] = len(self._teams)
+            self._teams.append(team)
+        return code
+
+    def _grow(self, needed):
+        capacity = len(self._columns['id'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def _append_rows(self, rows):
+        start, end = self._size, self._size + len(rows)
+        self._grow(end)
+        ids, names, teams, runs, balls, fours, sixes, strike_rates = zip(*rows)
+        columns = self._columns
+        columns['id'][start:end] = ids
+        columns['runs'][start:end] = runs
+        columns['balls'][start:end] = balls
+        columns['fours'][start:end] = fours
+        columns['sixes'][start:end] = sixes
+        columns['strike_rate'][start:end] = strike_rates
+        columns['team_code'][start:end] = [self._team_code(team) for team in teams]
+        columns['alive'][start:end] = True
+        self._names.extend(names)
+        for offset, player_id in enumerate(ids):
+            self._slots[player_id] = start + offset
+        self._size = end
+
+
+class PlayerColumnStore(_ColumnData):
+    """Columnar in-memory copy of the players table"""
+
+    def __init__(self, max_age=60.0, initial_capacity=1024):
+        super().__init__(initial_capacity)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._as_of = None
+        self._loading = False
+        self._pending = []
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Same as Leaderboard: the reload thread and its lock do not survive fork
+        self._lock = threading.Lock()
+        if self._loading:
+            self._loading = False
+            self._pending = []
+            self._loaded_at = None
+
+    def is_fresh(self):
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.max_age
+
+    def load(self, conn, batch_size=50000):
+        """Rebuild every column from the players table"""
+        if not AVAILABLE:
+            return
+        # Build into fresh columns so queries keep using the old ones
+        read_at = time.time_ns()
+        count = conn.execute('SELECT COUNT(*) FROM players').fetchone()[0]
+        fresh = _ColumnData(initial_capacity=max(count, self._initial_capacity))
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            'SELECT id, name, team, runs, balls, fours, sixes, strike_rate FROM players'
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            fresh._append_rows(rows)
+
+        with self._lock:
+            self._columns, self._names, self._size = fresh._columns, fresh._names, fresh._size
+            self._slots, self._team_codes, self._teams = fresh._slots, fresh._team_codes, fresh._teams
+            self._loaded_at = time.monotonic()
+            self._as_of = read_at
+            # Replay writes that committed while the snapshot was being read
+            pending, self._pending = self._pending, []
+            for op, value in pending:
+                if op == 'upsert':
+                    self._upsert(value)
+                else:
+                    self._remove(value)
+
+    def reload_in_background(self, pool):
+        """Reload from a pooled connection on a daemon thread"""
+        if not AVAILABLE:
+            return
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+
+        def run():
+            try:
+                with pool.connection() as conn:
+                    self.load(conn)
+            finally:
+                with self._lock:
+                    self._loading = False
+                    self._pending = []
+
+        threading.Thread(target=run, name='column-store-reload', daemon=True).start()
+
+    def _upsert(self, player):
+        slot = self._slots.get(player['id'])
+        if slot is None:
+            self._append_rows([(player['id'], player['name'], player['team'], player['runs'],
+                                player['balls'], player['fours'], player['sixes'],
+                                player['strike_rate'])])
+            return
+        for name in NUMERIC_COLUMNS:
+            self._columns[name][slot] = player[name]
+        self._columns['team_code'][slot] = self._team_code(player['team'])
+        self._names[slot] = player['name']
+
+    def _remove(self, player_id):
+        slot = self._slots.pop(player_id, None)
+        if slot is not None:
+            self._columns['alive'][slot] = False
+
+    def upsert(self, player):
+        """Write one player row into its slot, appending if new"""
+        if not AVAILABLE:
+            return
+        player = dict(player)
+        with self._lock:
+            if self._loading:
+                self._pending.append(('upsert', player))
+            if self._loaded_at is not None:
+                self._upsert(player)
+
+    def remove(self, player_id):
+        """Mask a deleted player out of every query"""
+        if not AVAILABLE:
+            return
+        with self._lock:
+            if self._loading:
+                self._pending.append(('remove', player_id))
+            if self._loaded_at is not None:
+                self._remove(player_id)
+
+    def as_of(self):
+        """time_ns() when the last load began reading; later writes from
+        other workers are not reflected"""
+        return self._as_of
+
+    def invalidate(self):
+        """Mark the store stale so the next query falls back to SQL"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _mask(self, team=None, min_balls=0):
+        size = self._size
+        mask = self._columns['alive'][:size].copy()
+        if team is not None:
+            code = self._team_codes.get(team)
+            if code is None:
+                return np.zeros(size, dtype=bool)
+            mask &= self._columns['team_code'][:size] == code
+        if min_balls:
+            mask &= self._columns['balls'][:size] >= min_balls
+        return mask
+
+    def _row(self, slot):
+        columns = self._columns
+        return {
+            'id': int(columns['id'][slot]),
+            'name': self._names[slot],
+            'team': self._teams[columns['team_code'][slot]],
+            'runs': int(columns['runs'][slot]),
+            'balls': int(columns['balls'][slot]),
+            'fours': int(columns['fours'][slot]),
+            'sixes': int(columns['sixes'][slot]),
+            'strike_rate': float(columns['strike_rate'][slot]),
+        }
+
+    def top_n(self, column, n=5, team=None, min_balls=0):
+        """Top n players by a numeric column, or None if the store is stale"""
+        with self._lock:
+            if not self.is_fresh():
+                return None
+            mask = self._mask(team, min_balls)
+            candidates = np.flatnonzero(mask)
+            values = self._columns[column][candidates]
+            if 0 < n < len(candidates):
+                # argpartition is O(len); only the n winners get fully sorted
+                part = np.argpartition(-values, n - 1)[:n]
+                candidates, values = candidates[part], values[part]
+            order = np.lexsort((self._columns['id'][candidates], -values))
+            return [self._row(slot) for slot in candidates[order]]
+
+    def team_statistics(self):
+        """Per-team players_count, total_runs and avg_strike_rate, or None if stale"""
+        with self._lock:
+            if not self.is_fresh():
+                return None
+            size = self._size
+            alive = self._columns['alive'][:size]
+            codes = self._columns['team_code'][:size][alive]
+            teams = len(self._teams)
+            counts = np.bincount(codes, minlength=teams)
+            runs = np.bincount(codes, weights=self._columns['runs'][:size][alive], minlength=teams)
+            rates = np.bincount(codes, weights=self._columns['strike_rate'][:size][alive],
+                                minlength=teams)
+            return sorted(
+                ({'team': self._teams[code],
+                  'players_count': int(counts[code]),
+                  'total_runs': int(runs[code]),
+                  'avg_strike_rate': float(rates[code] / counts[code])}
+                 for code in range(teams) if counts[code]),
+                key=lambda stat: stat['team']
+            )
+
+    def percentiles(self, column, qs, team=None, min_balls=0):
+        """Percentiles (0-100) of a column, or None if the store is stale"""
+        with self._lock:
+            if not self.is_fresh():
+                return None
+            values = self._columns[column][:self._size][self._mask(team, min_balls)]
+            if not len(values):
+                return {}
+            return {str(q): float(v) for q, v in zip(qs, np.percentile(values, qs))}
+
+    def rank(self, player_id, column, team=None, min_balls=0):
+        """(rank, out_of) of a player by column among the filtered players"""
+        with self._lock:
+            if not self.is_fresh():
+                return None
+            slot = self._slots.get(player_id)
+            if slot is None:
+                return None
+            mask = self._mask(team, min_balls)
+            if not mask[slot]:
+                return None
+            values = self._columns[column][:self._size]
+            return int(np.count_nonzero(values[mask] > values[slot])) + 1, int(mask.sum())
+
+    def stats(self):
+        """Return store size and memory use for monitoring"""
+        with self._lock:
+            return {
+                'available': AVAILABLE,
+                'fresh': self.is_fresh(),
+                'max_age': self.max_age,
+                'players': len(self._slots),
+                'slots': self._size,
+                'teams': len(self._teams),
+                'bytes': sum(column.nbytes for column in self._columns.values()),
+            }
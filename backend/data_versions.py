@@ -0,0 +1,140 @@
+"""
+Per-table data versions shared by every process that writes the database.
+
+Read endpoints derive their ETag from the versions of the tables they read,
+so an If-None-Match revalidation is answered with 304 before the view runs
+or a connection is acquired. The counters live in a small memory-mapped
+file next to the database, so a write in one gunicorn worker (or a CLI
+command) changes the ETag that every other worker hands out.
+
+Layout (little-endian):
+
+    header  HEADER      magic, epoch
+    slots   SLOT x N    version, bumped_at (time_ns) per table, in TABLES order
+
+The epoch is random per file and is renewed by reset() after a restore, so
+ETags issued before the file was recreated never match again. Writers
+bump a table after their transaction commits, under a POSIX record lock;
+readers unpack the slots without locking. bumped_at is stored before the
+version, so a reader that sees a new version also sees its time.
+
+bumped_at lets endpoints served from an eventually consistent view (the
+analytics snapshot, in-process leaderboards) check that the view was read
+after the last write before they attach an ETag to its result.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'CRKVER01'
+TABLES = ('players', 'matches', 'balls')
+
+HEADER = struct.Struct('<8sQ')
+SLOT = struct.Struct('<QQ')
+VERSION = struct.Struct('<Q')
+
+
+class DataVersions:
+    """Shared, memory-mapped version counters for a fixed set of tables"""
+
+    def __init__(self, path, tables=TABLES):
+        self.path = path
+        self.tables = tuple(tables)
+        self._offsets = {table: HEADER.size + index * SLOT.size
+                         for index, table in enumerate(self.tables)}
+        self._size = HEADER.size + SLOT.size * len(self.tables)
+        self._fd = None
+        self._map = None
+        self._lock = threading.Lock()
+        self._stats = {'bumps': 0, 'resets': 0}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The shared mapping stays valid; record locks are per process anyway
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """Map the counters file, creating or re-initializing it if needed"""
+        if self._map is not None:
+            return self._map
+        with self._lock:
+            if self._map is None:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX)
+                    try:
+                        header = os.pread(fd, HEADER.size, 0)
+                        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC or \
+                                os.fstat(fd).st_size != self._size:
+                            os.ftruncate(fd, 0)
+                            os.ftruncate(fd, self._size)
+                            os.pwrite(fd, HEADER.pack(MAGIC, self._new_epoch()), 0)
+                        self._map = mmap.mmap(fd, self._size)
+                    finally:
+                        fcntl.lockf(fd, fcntl.LOCK_UN)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+        return self._map
+
+    @staticmethod
+    def _new_epoch():
+        return int.from_bytes(os.urandom(8), 'little')
+
+    def _locked(self, update):
+        data = self._open()
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                update(data, time.time_ns())
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def bump(self, *tables):
+        """Record a committed write to tables; call after the commit"""
+        def update(data, now):
+            for table in tables:
+                offset = self._offsets[table]
+                version = VERSION.unpack_from(data, offset)[0]
+                VERSION.pack_into(data, offset + VERSION.size, now)
+                VERSION.pack_into(data, offset, version + 1)
+        self._locked(update)
+        self._stats['bumps'] += 1
+
+    def reset(self):
+        """Start a new epoch, e.g. after the database file was replaced"""
+        def update(data, now):
+            HEADER.pack_into(data, 0, MAGIC, self._new_epoch())
+            for offset in self._offsets.values():
+                VERSION.pack_into(data, offset + VERSION.size, now)
+        self._locked(update)
+        self._stats['resets'] += 1
+
+    def etag(self, tables):
+        """(ETag value, latest bumped_at in ns) for the given tables"""
+        data = self._open()
+        epoch = HEADER.unpack_from(data, 0)[1]
+        parts, bumped_at = [format(epoch, 'x')], 0
+        for table in tables:
+            version, at = SLOT.unpack_from(data, self._offsets[table])
+            parts.append(str(version))
+            bumped_at = max(bumped_at, at)
+        return '-'.join(parts), bumped_at
+
+    def versions(self):
+        """{table: version} for monitoring"""
+        data = self._open()
+        return {table: SLOT.unpack_from(data, offset)[0]
+                for table, offset in self._offsets.items()}
+
+    def stats(self):
+        """Return the current versions and counters for monitoring"""
+        stats = dict(self._stats)
+        stats.update(path=self.path, versions=self.versions())
+        return stats
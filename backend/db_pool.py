@@ -0,0 +1,344 @@
+"""
+Connection pools for the Cricket Analytics API.
+
+Connections are opened once, tuned with WAL journaling and performance
+pragmas, and handed back to an idle pool when a request finishes instead of
+being closed. The pool is fork-safe: connections inherited from a gunicorn
+master are dropped (never reused or closed) in the child worker.
+
+PostgresPool offers the same interface for the postgres storage backend,
+with a hard upper bound on open connections. psycopg2 is optional and only
+needed when that backend is used.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    import psycopg2.extras
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg2 = None
+
+# Default pragmas applied to every new connection. Values can be overridden
+# through environment variables so deployments can tune them without code
+# changes (e.g. SQLITE_CACHE_SIZE=-64000).
+DEFAULT_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),        # ~20MB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),       # 256MB
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),      # ms
+    'temp_store': 'MEMORY',
+}
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers the process that opened it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owner_pid = os.getpid()
+
+
+class ConnectionPool:
+    """Pool of tuned sqlite3 connections shared by the threads of one process"""
+
+    def __init__(self, database, max_idle=8, pragmas=None, functions=None, on_acquire=None):
+        self.database = database
+        self.max_idle = max_idle
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        # name -> (nargs, callable) registered as deterministic SQL functions
+        self.functions = dict(functions or {})
+        # Called with every connection handed out, e.g. to ATTACH databases
+        self.on_acquire = on_acquire
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+        self._in_use = 0
+        self._stats = {
+            'opened': 0,
+            'closed': 0,
+            'reused': 0,
+            'released': 0,
+            'discarded_after_fork': 0,
+            'acquire_time_ms': 0.0,
+        }
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """Forget connections inherited from the parent process"""
+        # SQLite handles must not be used (or closed) across fork, so the
+        # child simply drops its references and opens fresh connections.
+        self._lock = threading.Lock()
+        self._stats['discarded_after_fork'] += len(self._idle)
+        self._idle = []
+        self._in_use = 0
+        self._pid = os.getpid()
+
+    def _open(self):
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.pragmas.get('busy_timeout', 5000) / 1000.0,
+            check_same_thread=False,
+            factory=PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        for name, (nargs, func) in self.functions.items():
+            conn.create_function(name, nargs, func, deterministic=True)
+        self._stats['opened'] += 1
+        return conn
+
+    def acquire(self):
+        """Take a connection from the pool, opening one if none are idle"""
+        started = time.perf_counter()
+        if self._pid != os.getpid():
+            self._after_fork()
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                raise
+        else:
+            self._stats['reused'] += 1
+
+        if self.on_acquire is not None:
+            try:
+                self.on_acquire(conn)
+            except Exception:
+                self.release(conn)
+                raise
+
+        self._stats['acquire_time_ms'] += (time.perf_counter() - started) * 1000
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if getattr(conn, 'owner_pid', None) != os.getpid():
+            # Connection belongs to another process; never touch it here
+            self._stats['discarded_after_fork'] += 1
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._close(conn)
+            with self._lock:
+                self._in_use -= 1
+            return
+
+        with self._lock:
+            self._in_use -= 1
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                self._stats['released'] += 1
+                return
+        self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._stats['closed'] += 1
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection owned by this process"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Return pool statistics for monitoring"""
+        with self._lock:
+            idle = len(self._idle)
+            in_use = self._in_use
+        stats = dict(self._stats)
+        stats['acquire_time_ms'] = round(stats['acquire_time_ms'], 3)
+        stats.update({
+            'database': self.database,
+            'pid': self._pid,
+            'idle': idle,
+            'in_use': in_use,
+            'max_idle': self.max_idle,
+            'pragmas': self.pragmas,
+        })
+        return stats
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout"""
+
+
+if psycopg2 is not None:
+    class PooledPgConnection(psycopg2.extensions.connection):
+        """psycopg2 connection that remembers the process that opened it"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.owner_pid = os.getpid()
+
+
+class PostgresPool:
+    """Bounded pool of psycopg2 connections shared by the threads of one process"""
+
+    def __init__(self, dsn, max_connections=10, max_idle=None, timeout=5.0):
+        if psycopg2 is None:
+            raise RuntimeError('psycopg2 is required for the postgres storage backend')
+        self.dsn = dsn
+        self.max_connections = max_connections
+        self.max_idle = max_connections if max_idle is None else max_idle
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+        self._in_use = 0
+        self._stats = {
+            'opened': 0,
+            'closed': 0,
+            'reused': 0,
+            'released': 0,
+            'timeouts': 0,
+            'discarded_after_fork': 0,
+            'acquire_time_ms': 0.0,
+        }
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """Forget connections inherited from the parent process"""
+        # Closing an inherited socket would end the parent's session, so the
+        # child only drops its references
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._stats['discarded_after_fork'] += len(self._idle)
+        self._idle = []
+        self._in_use = 0
+        self._pid = os.getpid()
+
+    def _open(self):
+        conn = psycopg2.connect(
+            self.dsn,
+            connection_factory=PooledPgConnection,
+            cursor_factory=psycopg2.extras.RealDictCursor,
+        )
+        self._stats['opened'] += 1
+        return conn
+
+    def acquire(self):
+        """Take a connection, waiting up to timeout when all are in use"""
+        started = time.perf_counter()
+        if self._pid != os.getpid():
+            self._after_fork()
+
+        if not self._slots.acquire(timeout=self.timeout):
+            self._stats['timeouts'] += 1
+            raise PoolTimeout(f'No connection free after {self.timeout}s')
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                self._slots.release()
+                raise
+        else:
+            self._stats['reused'] += 1
+
+        self._stats['acquire_time_ms'] += (time.perf_counter() - started) * 1000
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if getattr(conn, 'owner_pid', None) != os.getpid():
+            self._stats['discarded_after_fork'] += 1
+            return
+
+        keep = not conn.closed
+        if keep and conn.status != psycopg2.extensions.STATUS_READY:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                keep = False
+
+        with self._lock:
+            self._in_use -= 1
+            keep = keep and len(self._idle) < self.max_idle
+            if keep:
+                self._idle.append(conn)
+                self._stats['released'] += 1
+        self._slots.release()
+        if not keep:
+            self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self._stats['closed'] += 1
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection owned by this process"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Return pool statistics for monitoring"""
+        with self._lock:
+            idle = len(self._idle)
+            in_use = self._in_use
+        stats = dict(self._stats)
+        stats['acquire_time_ms'] = round(stats['acquire_time_ms'], 3)
+        stats.update({
+            'pid': self._pid,
+            'idle': idle,
+            'in_use': in_use,
+            'max_connections': self.max_connections,
+            'max_idle': self.max_idle,
+        })
+        return stats
@@ -0,0 +1,85 @@
+"""
+Streaming table export for warehouse dumps.
+
+Rows are read from a sqlite cursor in fetchmany() batches and encoded as
+NDJSON or CSV chunk by chunk, optionally gzip-compressed on the fly, so
+memory use stays constant no matter how large the table is.
+"""
+import csv
+import io
+import zlib
+
+from serializers import PLAYER_FIELDS, MATCH_FIELDS, RowSerializer, dumps
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = {
+    'players': PLAYER_FIELDS,
+    'matches': MATCH_FIELDS,
+}
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_batches(conn, table, batch_size=EXPORT_BATCH_SIZE):
+    """Yield lists of row tuples from a table in primary key order"""
+    columns = ', '.join(EXPORT_COLUMNS[table])
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(f'SELECT {columns} FROM {table} ORDER BY id')
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+    cursor.close()
+
+
+def encode_ndjson(columns, batches):
+    """Encode row batches as newline-delimited JSON"""
+    serializer = RowSerializer(columns)
+    for rows in batches:
+        yield b''.join(dumps(row) + b'\n' for row in serializer.tuples(rows))
+
+
+def encode_csv(columns, batches):
+    """Encode row batches as CSV with a header line"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_table(pool, table, fmt='ndjson', compress=False):
+    """Generate the encoded export of a table using a pooled connection"""
+    columns = EXPORT_COLUMNS[table]
+    encoder = encode_csv if fmt == 'csv' else encode_ndjson
+
+    conn = pool.acquire()
+    try:
+        chunks = encoder(columns, iter_batches(conn, table))
+        if compress:
+            chunks = gzip_chunks(chunks)
+        for chunk in chunks:
+            yield chunk
+    finally:
+        pool.release(conn)
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for the Cricket Analytics API.
+
+The app is imported once in the master (importing it touches no database).
+Before any worker forks the master restores the latest backup into an empty
+database and migrates the schema, so workers start against an up-to-date
+schema and never race each other to migrate. Periodic backups also run in
+the master, which serves no requests, with a final one on shutdown. Each
+worker commits its queued live-score updates before it exits.
+"""
+import logging
+
+preload_app = True
+
+
+def on_starting(server):
+    """Restore, migrate and start backups in the master process"""
+    from app import BACKUP_ENABLED, database_backup, restore_backup, run_migrations
+
+    logger = logging.getLogger('gunicorn.error')
+    restore_backup()  # logs the restore time
+    applied = run_migrations()
+    for version, name, duration_ms in applied:
+        logger.info('Applied migration %s %s in %s ms', version, name, duration_ms)
+    if not applied:
+        logger.info('Schema is up to date')
+    if BACKUP_ENABLED:
+        database_backup.start()
+
+
+def worker_exit(server, worker):
+    """Commit updates still waiting in this worker's write queue"""
+    from app import write_queue
+
+    write_queue.stop()
+
+
+def on_exit(server):
+    """Back up writes made since the last periodic backup"""
+    from app import BACKUP_ENABLED, database_backup
+
+    if BACKUP_ENABLED:
+        result = database_backup.backup(force=False)
+        if result is not None:
+            logging.getLogger('gunicorn.error').info(
+                'Backed up database to %s in %s ms', database_backup.path, result['total_ms'])
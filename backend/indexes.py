@@ -0,0 +1,167 @@
+"""
+Secondary indexes for the SQLite schema and a query-plan regression check.
+
+INDEXES is the index set of the latest schema. The migrations in
+migrations.py create it, each with its own copy of the DDL it shipped, so a
+migration that changes an index updates INDEXES too; missing_indexes()
+reports any entry a migrated database lacks. HOT_QUERIES lists the hot
+read paths, reusing the SQL of the modules that run them;
+check_query_plans() runs EXPLAIN QUERY PLAN on each and reports any that
+fall back to a table scan or a sort the query does not expect.
+"""
+import re
+
+from name_index import suggest_query
+from player_queries import top_players_query
+from repository import (
+    PAGE_SQL, PAGE_AFTER_SQL, GET_SQL, LIVE_MATCH_SQL, LATEST_MATCH_SQL, ARCHIVED_MATCHES
+)
+from scorecard import (
+    CURRENT_INNINGS_SQL, CURRENT_BATTERS_SQL, BATTING_CARD_SQL, BOWLING_CARD_SQL
+)
+from scores import TEAM_SCORING_SQL, VENUE_SCORING_SQL
+from search import MAX_CANDIDATES, SEARCH_SQL, fts_query
+from serializers import PLAYER_FIELDS, MATCH_FIELDS
+from team_stats import READ_SQL as TEAM_STATS_SQL
+
+INDEXES = {
+    # Current batters: WHERE team = ? ORDER BY runs DESC LIMIT 2.
+    # strike_rate is included so GROUP BY team is answered from the index.
+    'idx_players_team_runs':
+        'CREATE INDEX IF NOT EXISTS idx_players_team_runs '
+        'ON players(team, runs DESC, strike_rate)',
+    # One row per (name, team); the conflict target of bulk upserts
+    'idx_players_name_team':
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_players_name_team ON players(name, team)',
+    # Name autocomplete within one team: team = ? AND name range ORDER BY name
+    'idx_players_team_name':
+        'CREATE INDEX IF NOT EXISTS idx_players_team_name ON players(team, name)',
+    # Top run scorers: ORDER BY runs DESC LIMIT 5
+    'idx_players_runs':
+        'CREATE INDEX IF NOT EXISTS idx_players_runs ON players(runs DESC)',
+    # Top strike rates among players who faced at least 10 balls
+    'idx_players_strike_rate_qualified':
+        'CREATE INDEX IF NOT EXISTS idx_players_strike_rate_qualified '
+        'ON players(strike_rate DESC) WHERE balls >= 10',
+    # The same within one team: team = ? ORDER BY strike_rate DESC LIMIT ?
+    'idx_players_team_strike_rate_qualified':
+        'CREATE INDEX IF NOT EXISTS idx_players_team_strike_rate_qualified '
+        'ON players(team, strike_rate DESC) WHERE balls >= 10',
+    # Live match lookup; only live rows are indexed so it stays tiny
+    'idx_matches_live':
+        "CREATE INDEX IF NOT EXISTS idx_matches_live "
+        "ON matches(id) WHERE status = 'Live'",
+    # Team scoring aggregates over normalized innings
+    'idx_match_innings_team_runs':
+        'CREATE INDEX IF NOT EXISTS idx_match_innings_team_runs '
+        'ON match_innings(team, runs)',
+    # Venue aggregates: first innings of each match, then join to matches
+    'idx_match_innings_first':
+        'CREATE INDEX IF NOT EXISTS idx_match_innings_first '
+        'ON match_innings(team_slot, innings_number, match_id, runs)',
+}
+
+# Plan steps a hot query may show without it being a problem. Each entry is
+# a whole plan line; "season_*." stands for any attached archive season.
+# - *_ROWID_ORDER: the query walks the primary key in order and stops at
+#   LIMIT (merging the live and archived tables for matches)
+# - TOP_N: a sort or scan of a result already cut to MAX_CANDIDATES or LIMIT rows
+# - SMALL_SORT: a sort of rows already narrowed by an index to one innings
+# - *_SCORING: each archived season is read whole, and the per-source
+#   aggregates are combined and sorted; the live tables must use an index
+PLAYERS_ROWID_ORDER = ('SCAN players',)
+MATCHES_ROWID_ORDER = ('SCAN matches',)
+ARCHIVED_MATCHES_ROWID_ORDER = ('SCAN main.matches', 'SCAN season_*.matches')
+TOP_N = ('SCAN candidates', 'SCAN f', 'USE TEMP B-TREE FOR ORDER BY')
+SMALL_SORT = ('USE TEMP B-TREE FOR ORDER BY',)
+COMBINED_AGGREGATE = ('SCAN sources', 'USE TEMP B-TREE FOR GROUP BY',
+                      'USE TEMP B-TREE FOR ORDER BY')
+TEAM_SCORING = COMBINED_AGGREGATE + ('SCAN season_*.match_innings',
+                                     'SCAN archived_match_innings')
+VENUE_SCORING = COMBINED_AGGREGATE + ('SCAN season_*.matches', 'SCAN ai')
+
+# Attached archive seasons, as named in plan lines
+SEASON_SCHEMA = re.compile(r'\bseason_\d+\.')
+
+# Columns the list endpoints select
+PLAYER_COLUMNS = ', '.join(PLAYER_FIELDS)
+MATCH_COLUMNS = ', '.join(MATCH_FIELDS)
+
+# (name, sql, params, expected plan steps). Where an endpoint's SQL lives in a
+# module it is used as-is here, so the check follows the code.
+HOT_QUERIES = [
+    ('players_page_first', PAGE_SQL.format(columns=PLAYER_COLUMNS, table='players'),
+     (101,), PLAYERS_ROWID_ORDER),
+    ('players_page_after', PAGE_AFTER_SQL.format(columns=PLAYER_COLUMNS, table='players'),
+     (1000, 101), ()),
+    ('player_by_id', GET_SQL.format(table='players'), (1,), ()),
+    ('matches_page_first', PAGE_SQL.format(columns=MATCH_COLUMNS, table=ARCHIVED_MATCHES),
+     (101,), ARCHIVED_MATCHES_ROWID_ORDER),
+    ('matches_page_after', PAGE_AFTER_SQL.format(columns=MATCH_COLUMNS, table=ARCHIVED_MATCHES),
+     (1000, 101), ()),
+    ('match_by_id', GET_SQL.format(table='matches'), (1,), ()),
+    ('archived_match_by_id', GET_SQL.format(table='archived_matches'), (1,), ()),
+    ('live_match', LIVE_MATCH_SQL, (), ()),
+    ('latest_match', LATEST_MATCH_SQL, (), MATCHES_ROWID_ORDER),
+    ('current_batters', *top_players_query('runs', 2, 'IND'), ()),
+    ('top_run_scorers', *top_players_query('runs', 5), ()),
+    ('top_strike_rates', *top_players_query('strike_rate', 5, min_balls=10), ()),
+    ('team_top_run_scorers', *top_players_query('runs', 5, 'IND'), ()),
+    ('team_top_strike_rates', *top_players_query('strike_rate', 5, 'IND', 10), ()),
+    ('team_statistics', TEAM_STATS_SQL, (), ()),
+    ('suggest_players', *suggest_query('V', 10), ()),
+    ('suggest_players_in_team', *suggest_query('V', 10, 'IND'), ()),
+    ('scorecard_current_innings', CURRENT_INNINGS_SQL, (1,), ()),
+    ('scorecard_current_batters', CURRENT_BATTERS_SQL, (1, 1, 2), SMALL_SORT),
+    ('scorecard_batting', BATTING_CARD_SQL.format(prefix=''), (1,), ()),
+    ('scorecard_bowling', BOWLING_CARD_SQL.format(prefix=''), (1,), ()),
+    ('archived_scorecard_batting', BATTING_CARD_SQL.format(prefix='archived_'), (1,), ()),
+    ('archived_scorecard_bowling', BOWLING_CARD_SQL.format(prefix='archived_'), (1,), ()),
+    ('team_scoring', TEAM_SCORING_SQL, (), TEAM_SCORING),
+    ('venue_scoring', VENUE_SCORING_SQL, (), VENUE_SCORING),
+] + [
+    (f'search_{kind}', sql, (fts_query('kohli'), MAX_CANDIDATES, 10), TOP_N)
+    for kind, sql in SEARCH_SQL.items()
+]
+
+
+def missing_indexes(conn):
+    """Names in INDEXES that the database does not have"""
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )}
+    return [name for name in INDEXES if name not in existing]
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query"""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def plan_problems(plan, expected=()):
+    """List the steps of a plan that indicate a full scan or a sort
+
+    Steps equal to one of the expected lines are not reported. FTS5 lookups
+    ("SCAN <fts> VIRTUAL TABLE INDEX") read the full-text index.
+    """
+    problems = []
+    for step in plan:
+        if SEASON_SCHEMA.sub('season_*.', step) in expected:
+            continue
+        if 'USE TEMP B-TREE' in step:
+            problems.append(step)
+        elif step.startswith('SCAN ') and ' USING ' not in step and \
+                'VIRTUAL TABLE INDEX' not in step:
+            problems.append(step)
+    return problems
+
+
+def check_query_plans(conn, queries=None):
+    """Explain every hot query; return {name: (plan, problems)} for failures"""
+    failures = {}
+    for name, sql, params, expected in (queries or HOT_QUERIES):
+        plan = explain(conn, sql, params)
+        problems = plan_problems(plan, expected)
+        if problems:
+            failures[name] = (plan, problems)
+    return failures
@@ -0,0 +1,176 @@
+"""
+In-process top-N leaderboards for run scorers and strike rates.
+
+Players are kept in two sorted lists (by runs and by strike rate) so top-N
+queries with optional team and minimum-balls filters are answered without
+touching the database. The write path keeps the lists current; when the
+board is invalidated or older than max_age (writes from other gunicorn
+workers are not seen), queries return None so callers fall back to SQL
+while a background reload runs.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+
+class Leaderboard:
+    """Sorted in-memory views of the players table"""
+
+    def __init__(self, max_age=60.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._players = {}
+        self._by_runs = []
+        self._by_strike_rate = []
+        self._loaded_at = None
+        self._as_of = None
+        self._loading = False
+        self._pending = []
+        self._stats = {'hits': 0, 'fallbacks': 0, 'reloads': 0}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """Reset locks and reload state copied from a forking parent"""
+        # The reload thread does not survive fork, and a lock held by it
+        # would otherwise stay locked forever in the child
+        self._lock = threading.Lock()
+        if self._loading:
+            self._loading = False
+            self._pending = []
+            self._loaded_at = None
+
+    @staticmethod
+    def _runs_key(player):
+        return (-player['runs'], player['id'])
+
+    @staticmethod
+    def _strike_rate_key(player):
+        return (-player['strike_rate'], player['id'])
+
+    def load(self, conn):
+        """Rebuild the board from the players table"""
+        read_at = time.time_ns()
+        players = {row['id']: dict(row) for row in conn.execute('SELECT * FROM players')}
+        by_runs = sorted(self._runs_key(p) for p in players.values())
+        by_strike_rate = sorted(self._strike_rate_key(p) for p in players.values())
+        with self._lock:
+            self._players = players
+            self._by_runs = by_runs
+            self._by_strike_rate = by_strike_rate
+            self._loaded_at = time.monotonic()
+            self._as_of = read_at
+            # Replay writes that committed while the snapshot was being read
+            pending, self._pending = self._pending, []
+            for op, value in pending:
+                if op == 'upsert':
+                    self._upsert(value)
+                else:
+                    self._remove(value)
+            self._stats['reloads'] += 1
+
+    def reload_in_background(self, pool):
+        """Reload from a pooled connection on a daemon thread"""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+
+        def run():
+            try:
+                with pool.connection() as conn:
+                    self.load(conn)
+            finally:
+                with self._lock:
+                    self._loading = False
+                    self._pending = []
+
+        threading.Thread(target=run, name='leaderboard-reload', daemon=True).start()
+
+    def is_fresh(self):
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.max_age
+
+    def as_of(self):
+        """time_ns() when the last load began reading; later writes from
+        other workers are not reflected"""
+        return self._as_of
+
+    def invalidate(self):
+        """Mark the board stale so the next query falls back to SQL"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _discard(self, player):
+        for entries, key in ((self._by_runs, self._runs_key(player)),
+                             (self._by_strike_rate, self._strike_rate_key(player))):
+            index = bisect_left(entries, key)
+            if index < len(entries) and entries[index] == key:
+                del entries[index]
+
+    def _upsert(self, player):
+        previous = self._players.get(player['id'])
+        if previous is not None:
+            self._discard(previous)
+        self._players[player['id']] = player
+        insort(self._by_runs, self._runs_key(player))
+        insort(self._by_strike_rate, self._strike_rate_key(player))
+
+    def _remove(self, player_id):
+        previous = self._players.pop(player_id, None)
+        if previous is not None:
+            self._discard(previous)
+
+    def upsert(self, player):
+        """Insert or replace one player row"""
+        player = dict(player)
+        with self._lock:
+            if self._loading:
+                self._pending.append(('upsert', player))
+            if self._loaded_at is not None:
+                self._upsert(player)
+
+    def remove(self, player_id):
+        """Drop one player from the board"""
+        with self._lock:
+            if self._loading:
+                self._pending.append(('remove', player_id))
+            if self._loaded_at is not None:
+                self._remove(player_id)
+
+    def _top(self, entries, n, team, min_balls):
+        with self._lock:
+            if not self.is_fresh():
+                self._stats['fallbacks'] += 1
+                return None
+            result = []
+            for _, player_id in entries:
+                player = self._players[player_id]
+                if team is not None and player['team'] != team:
+                    continue
+                if player['balls'] < min_balls:
+                    continue
+                result.append(dict(player))
+                if len(result) >= n:
+                    break
+            self._stats['hits'] += 1
+            return result
+
+    def top_run_scorers(self, n=5, team=None, min_balls=0):
+        """Top n players by runs, or None if the board is stale"""
+        return self._top(self._by_runs, n, team, min_balls)
+
+    def top_strike_rates(self, n=5, team=None, min_balls=10):
+        """Top n players by strike rate, or None if the board is stale"""
+        return self._top(self._by_strike_rate, n, team, min_balls)
+
+    def stats(self):
+        """Return leaderboard counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['players'] = len(self._players)
+        stats['fresh'] = self.is_fresh()
+        stats['max_age'] = self.max_age
+        return stats
@@ -0,0 +1,577 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+MIGRATIONS is an ordered list of (version, name, function). migrate() applies
+every migration newer than the highest version recorded in schema_version,
+each under BEGIN IMMEDIATE so concurrent processes serialize on the write
+lock and a migration never runs twice. Deployments run it once before the
+gunicorn workers fork (gunicorn.conf.py) or with `flask migrate`; worker
+startup only compares current_version() with LATEST_VERSION.
+
+Add new migrations at the end with the next version number and never edit
+one that has shipped. Each migration's DDL is written out here as it
+shipped instead of being taken from the modules that use the tables, so a
+migration does the same thing on every database however the code moves on.
+Migrations never commit: migrate() commits each one together with its
+schema_version row, so a failed migration leaves nothing behind. The early
+ones are idempotent because they adopt databases created before
+schema_version existed.
+"""
+import logging
+import time
+
+from scores import backfill_match_scores
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_PLAYERS = [
+    ('V. KOHLI', 'IND', 45, 56, 4, 0, 80.36),
+    ('S. IYER', 'IND', 23, 28, 3, 0, 82.14),
+    ('D. WARNER', 'AUS', 67, 54, 8, 2, 124.07),
+    ('S. SMITH', 'AUS', 34, 41, 4, 0, 82.93),
+    ('R. SHARMA', 'IND', 89, 72, 11, 3, 123.61),
+    ('M. LABUSCHAGNE', 'AUS', 56, 78, 6, 1, 71.79)
+]
+
+SAMPLE_MATCHES = [
+    ('IND', 'AUS', '210-3', '207&250', 'Live', '45.2', 'Melbourne Cricket Ground', '2025-01-15'),
+    ('ENG', 'NZ', '284-7', '156-4', 'Completed', '50.0', 'Lords', '2025-01-10'),
+    ('SA', 'WI', '0-0', '0-0', 'Upcoming', '0.0', 'Cape Town', '2025-01-20')
+]
+
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _add_missing_column(conn, table, column, definition):
+    """Add a column unless the table already has it; True if it was added"""
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    if column in columns:
+        return False
+    conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return True
+
+
+# ---- 1 initial_schema ----
+
+INITIAL_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS players (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        team TEXT NOT NULL,
+        runs INTEGER DEFAULT 0,
+        balls INTEGER DEFAULT 0,
+        fours INTEGER DEFAULT 0,
+        sixes INTEGER DEFAULT 0,
+        strike_rate REAL DEFAULT 0.0,
+        version INTEGER NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS matches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team1 TEXT NOT NULL,
+        team2 TEXT NOT NULL,
+        score1 TEXT DEFAULT '0-0',
+        score2 TEXT DEFAULT '0-0',
+        status TEXT DEFAULT 'Upcoming',
+        overs TEXT DEFAULT '0.0',
+        venue TEXT,
+        match_date DATE,
+        balls_bowled INTEGER DEFAULT 0,
+        version INTEGER NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+]
+
+# Normalized innings scores derived from score1/score2/overs
+INITIAL_MATCH_INNINGS = '''
+    CREATE TABLE IF NOT EXISTS match_innings (
+        match_id INTEGER NOT NULL,
+        team_slot INTEGER NOT NULL,
+        team TEXT NOT NULL,
+        innings_number INTEGER NOT NULL,
+        runs INTEGER NOT NULL,
+        wickets INTEGER NOT NULL,
+        declared INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (match_id, team_slot, innings_number)
+    )
+'''
+
+# Append-only deliveries and the scorecards a trigger derives from them
+INITIAL_BALL_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS ball_by_ball (
+        match_id INTEGER NOT NULL,
+        innings_number INTEGER NOT NULL,
+        over_number INTEGER NOT NULL,
+        ball_number INTEGER NOT NULL,
+        batsman_id INTEGER,
+        bowler_id INTEGER,
+        runs_scored INTEGER NOT NULL DEFAULT 0,
+        extras INTEGER NOT NULL DEFAULT 0,
+        wicket_type TEXT,
+        wicket_player_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (match_id, innings_number, over_number, ball_number)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS batting_scorecard (
+        match_id INTEGER NOT NULL,
+        innings_number INTEGER NOT NULL,
+        batsman_id INTEGER NOT NULL,
+        runs INTEGER NOT NULL DEFAULT 0,
+        balls INTEGER NOT NULL DEFAULT 0,
+        fours INTEGER NOT NULL DEFAULT 0,
+        sixes INTEGER NOT NULL DEFAULT 0,
+        dismissed INTEGER NOT NULL DEFAULT 0,
+        last_sequence INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (match_id, innings_number, batsman_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS bowling_scorecard (
+        match_id INTEGER NOT NULL,
+        innings_number INTEGER NOT NULL,
+        bowler_id INTEGER NOT NULL,
+        balls INTEGER NOT NULL DEFAULT 0,
+        runs_conceded INTEGER NOT NULL DEFAULT 0,
+        wickets INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (match_id, innings_number, bowler_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_ball_by_ball_scorecard
+    AFTER INSERT ON ball_by_ball
+    BEGIN
+        INSERT INTO batting_scorecard (match_id, innings_number, batsman_id, runs, balls,
+                                       fours, sixes, dismissed, last_sequence)
+        SELECT NEW.match_id, NEW.innings_number, NEW.batsman_id, NEW.runs_scored, 1,
+               NEW.runs_scored = 4, NEW.runs_scored = 6,
+               CASE WHEN NEW.wicket_type IS NOT NULL AND coalesce(NEW.wicket_player_id,
+                    NEW.batsman_id) = NEW.batsman_id THEN 1 ELSE 0 END,
+               (NEW.over_number * 1000 + NEW.ball_number)
+        WHERE NEW.batsman_id IS NOT NULL
+        ON CONFLICT(match_id, innings_number, batsman_id) DO UPDATE SET
+            runs = runs + excluded.runs,
+            balls = balls + 1,
+            fours = fours + excluded.fours,
+            sixes = sixes + excluded.sixes,
+            dismissed = max(dismissed, excluded.dismissed),
+            last_sequence = max(last_sequence, excluded.last_sequence);
+
+        -- Dismissal of the non-striker (e.g. run out at the other end)
+        UPDATE batting_scorecard SET dismissed = 1
+        WHERE NEW.wicket_player_id IS NOT NULL
+          AND NEW.wicket_player_id IS NOT NEW.batsman_id
+          AND match_id = NEW.match_id
+          AND innings_number = NEW.innings_number
+          AND batsman_id = NEW.wicket_player_id;
+
+        INSERT INTO bowling_scorecard (match_id, innings_number, bowler_id, balls,
+                                       runs_conceded, wickets)
+        SELECT NEW.match_id, NEW.innings_number, NEW.bowler_id, 1,
+               NEW.runs_scored + NEW.extras,
+               CASE WHEN NEW.wicket_type IS NOT NULL AND lower(NEW.wicket_type) NOT IN (
+                    'run out', 'retired hurt', 'obstructing the field') THEN 1 ELSE 0 END
+        WHERE NEW.bowler_id IS NOT NULL
+        ON CONFLICT(match_id, innings_number, bowler_id) DO UPDATE SET
+            balls = balls + 1,
+            runs_conceded = runs_conceded + excluded.runs_conceded,
+            wickets = wickets + excluded.wickets;
+    END
+    ''',
+]
+
+# Per-team player aggregates kept current by triggers on players
+INITIAL_TEAM_STATS = [
+    '''
+    CREATE TABLE IF NOT EXISTS team_statistics (
+        team TEXT PRIMARY KEY,
+        players_count INTEGER NOT NULL DEFAULT 0,
+        total_runs INTEGER NOT NULL DEFAULT 0,
+        strike_rate_sum REAL NOT NULL DEFAULT 0.0
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_players_team_stats_insert
+    AFTER INSERT ON players
+    BEGIN
+        INSERT INTO team_statistics (team, players_count, total_runs, strike_rate_sum)
+        VALUES (NEW.team, 1, NEW.runs, NEW.strike_rate)
+        ON CONFLICT(team) DO UPDATE SET
+            players_count = players_count + 1,
+            total_runs = total_runs + NEW.runs,
+            strike_rate_sum = strike_rate_sum + NEW.strike_rate;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_players_team_stats_delete
+    AFTER DELETE ON players
+    BEGIN
+        UPDATE team_statistics SET
+            players_count = players_count - 1,
+            total_runs = total_runs - OLD.runs,
+            strike_rate_sum = strike_rate_sum - OLD.strike_rate
+        WHERE team = OLD.team;
+        DELETE FROM team_statistics WHERE team = OLD.team AND players_count <= 0;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_players_team_stats_update
+    AFTER UPDATE OF team, runs, strike_rate ON players
+    BEGIN
+        UPDATE team_statistics SET
+            players_count = players_count - 1,
+            total_runs = total_runs - OLD.runs,
+            strike_rate_sum = strike_rate_sum - OLD.strike_rate
+        WHERE team = OLD.team;
+        DELETE FROM team_statistics WHERE team = OLD.team AND players_count <= 0;
+        INSERT INTO team_statistics (team, players_count, total_runs, strike_rate_sum)
+        VALUES (NEW.team, 1, NEW.runs, NEW.strike_rate)
+        ON CONFLICT(team) DO UPDATE SET
+            players_count = players_count + 1,
+            total_runs = total_runs + NEW.runs,
+            strike_rate_sum = strike_rate_sum + NEW.strike_rate;
+    END
+    ''',
+]
+
+
+def _initial_schema(conn):
+    for ddl in INITIAL_TABLES:
+        conn.execute(ddl)
+    # Row versions for optimistic concurrency on databases created earlier
+    for table in ('players', 'matches'):
+        _add_missing_column(conn, table, 'version', 'INTEGER NOT NULL DEFAULT 1')
+
+    backfill = not _table_exists(conn, 'match_innings')
+    conn.execute(INITIAL_MATCH_INNINGS)
+    backfill |= _add_missing_column(conn, 'matches', 'balls_bowled', 'INTEGER DEFAULT 0')
+
+    for ddl in INITIAL_BALL_TABLES:
+        conn.execute(ddl)
+
+    seed_team_stats = not _table_exists(conn, 'team_statistics')
+    for ddl in INITIAL_TEAM_STATS:
+        conn.execute(ddl)
+    if seed_team_stats:
+        conn.execute('''
+            INSERT INTO team_statistics (team, players_count, total_runs, strike_rate_sum)
+            SELECT team, COUNT(*), SUM(runs), SUM(strike_rate) FROM players GROUP BY team
+        ''')
+
+    if backfill:
+        # Normalized score storage added to an existing database
+        backfill_match_scores(conn)
+
+
+# ---- 2 hot_query_indexes ----
+
+HOT_QUERY_INDEXES = {
+    'idx_players_team_runs':
+        'CREATE INDEX IF NOT EXISTS idx_players_team_runs '
+        'ON players(team, runs DESC, strike_rate)',
+    'idx_players_name_team':
+        'CREATE INDEX IF NOT EXISTS idx_players_name_team ON players(name, team)',
+    'idx_players_runs':
+        'CREATE INDEX IF NOT EXISTS idx_players_runs ON players(runs DESC)',
+    'idx_players_strike_rate_qualified':
+        'CREATE INDEX IF NOT EXISTS idx_players_strike_rate_qualified '
+        'ON players(strike_rate DESC) WHERE balls >= 10',
+    'idx_matches_live':
+        "CREATE INDEX IF NOT EXISTS idx_matches_live "
+        "ON matches(id) WHERE status = 'Live'",
+    'idx_match_innings_team_runs':
+        'CREATE INDEX IF NOT EXISTS idx_match_innings_team_runs '
+        'ON match_innings(team, runs)',
+    'idx_match_innings_first':
+        'CREATE INDEX IF NOT EXISTS idx_match_innings_first '
+        'ON match_innings(team_slot, innings_number, match_id, runs)',
+}
+
+
+def _hot_query_indexes(conn):
+    # Adopted databases may carry indexes from an earlier index set
+    existing = conn.execute(
+        "SELECT name FROM sqlite_master "
+        "WHERE type = 'index' AND name LIKE 'idx_%' "
+        "AND tbl_name IN ('players', 'matches', 'match_innings')"
+    ).fetchall()
+    for row in existing:
+        if row[0] not in HOT_QUERY_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {row[0]}')
+    for ddl in HOT_QUERY_INDEXES.values():
+        conn.execute(ddl)
+
+
+# ---- 3 sample_data ----
+
+def _sample_data(conn):
+    if conn.execute('SELECT COUNT(*) FROM players').fetchone()[0] == 0:
+        conn.executemany('''
+            INSERT INTO players (name, team, runs, balls, fours, sixes, strike_rate)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', SAMPLE_PLAYERS)
+    if conn.execute('SELECT COUNT(*) FROM matches').fetchone()[0] == 0:
+        conn.executemany('''
+            INSERT INTO matches (team1, team2, score1, score2, status, overs, venue, match_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', SAMPLE_MATCHES)
+        backfill_match_scores(conn)
+
+
+# ---- 4 full_text_search ----
+
+# Optional text per delivery, in a rowid table so FTS5 can index it
+COMMENTARY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS ball_commentary (
+        id INTEGER PRIMARY KEY,
+        match_id INTEGER NOT NULL,
+        innings_number INTEGER NOT NULL,
+        over_number INTEGER NOT NULL,
+        ball_number INTEGER NOT NULL,
+        commentary TEXT NOT NULL,
+        UNIQUE (match_id, innings_number, over_number, ball_number)
+    )
+'''
+
+# name -> (source table, indexed columns, bm25 weights per column)
+FTS_INDEXES = {
+    'players_fts': ('players', ('name', 'team'), (10.0, 1.0)),
+    'matches_fts': ('matches', ('team1', 'team2', 'venue'), (2.0, 2.0, 5.0)),
+    'commentary_fts': ('ball_commentary', ('commentary',), (1.0,)),
+}
+
+
+def _full_text_search(conn):
+    conn.execute(COMMENTARY_TABLE)
+    # External-content indexes kept in step by triggers on their source tables
+    for fts, (table, columns, weights) in FTS_INDEXES.items():
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'NEW.{column}' for column in columns)
+        old_values = ', '.join(f'OLD.{column}' for column in columns)
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {column_list}, content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+            )
+        ''')
+        conn.execute(f"INSERT INTO {fts}({fts}, rank) VALUES "
+                     f"('rank', 'bm25({', '.join(map(str, weights))})')")
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+            AFTER UPDATE OF {column_list} ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO {fts}(rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+# ---- 5 unique_player_key ----
+
+# Duplicate keys named in the error when the unique key cannot be added
+MAX_LISTED_DUPLICATES = 20
+
+UNIQUE_PLAYER_KEY = ('CREATE UNIQUE INDEX IF NOT EXISTS idx_players_name_team '
+                     'ON players(name, team)')
+
+
+def _unique_player_key(conn):
+    # Concurrent bulk upserts could store a player twice. Deliveries and
+    # scorecards (and archived seasons) refer to each copy by id, so they are
+    # not deleted here: the migration stops until someone merges them.
+    duplicates = conn.execute('''
+        SELECT name, team, group_concat(id, ', ')
+        FROM (SELECT name, team, id FROM players ORDER BY id)
+        GROUP BY name, team
+        HAVING COUNT(*) > 1
+        ORDER BY name, team
+    ''').fetchall()
+    if duplicates:
+        keys = '; '.join(f'{name!r}/{team!r}: ids {ids}'
+                         for name, team, ids in duplicates[:MAX_LISTED_DUPLICATES])
+        if len(duplicates) > MAX_LISTED_DUPLICATES:
+            keys += f'; and {len(duplicates) - MAX_LISTED_DUPLICATES} more'
+        logger.error('Players stored more than once: %s', keys)
+        raise RuntimeError(
+            f'Cannot add the unique (name, team) key; players stored more than '
+            f'once: {keys}. Point their deliveries at one id, '
+            f'delete or rename the other rows, then run `flask migrate` again.')
+    conn.execute('DROP INDEX IF EXISTS idx_players_name_team')
+    conn.execute(UNIQUE_PLAYER_KEY)
+
+
+# ---- 6 ball_extras_type ----
+
+# Wides are not a ball faced and, like no-balls, not a legal delivery in the
+# bowler's figures; byes and leg byes are not charged to the bowler. Rows
+# without an extras_type keep the earlier accounting.
+EXTRAS_TYPE_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS trg_ball_by_ball_scorecard
+    AFTER INSERT ON ball_by_ball
+    BEGIN
+        INSERT INTO batting_scorecard (match_id, innings_number, batsman_id, runs, balls,
+                                       fours, sixes, dismissed, last_sequence)
+        SELECT NEW.match_id, NEW.innings_number, NEW.batsman_id, NEW.runs_scored,
+               CASE WHEN NEW.extras_type IS 'wide' THEN 0 ELSE 1 END,
+               NEW.runs_scored = 4, NEW.runs_scored = 6,
+               CASE WHEN NEW.wicket_type IS NOT NULL AND coalesce(NEW.wicket_player_id,
+                    NEW.batsman_id) = NEW.batsman_id THEN 1 ELSE 0 END,
+               (NEW.over_number * 1000 + NEW.ball_number)
+        WHERE NEW.batsman_id IS NOT NULL
+        ON CONFLICT(match_id, innings_number, batsman_id) DO UPDATE SET
+            runs = runs + excluded.runs,
+            balls = balls + excluded.balls,
+            fours = fours + excluded.fours,
+            sixes = sixes + excluded.sixes,
+            dismissed = max(dismissed, excluded.dismissed),
+            last_sequence = max(last_sequence, excluded.last_sequence);
+
+        -- Dismissal of the non-striker (e.g. run out at the other end)
+        UPDATE batting_scorecard SET dismissed = 1
+        WHERE NEW.wicket_player_id IS NOT NULL
+          AND NEW.wicket_player_id IS NOT NEW.batsman_id
+          AND match_id = NEW.match_id
+          AND innings_number = NEW.innings_number
+          AND batsman_id = NEW.wicket_player_id;
+
+        INSERT INTO bowling_scorecard (match_id, innings_number, bowler_id, balls,
+                                       runs_conceded, wickets)
+        SELECT NEW.match_id, NEW.innings_number, NEW.bowler_id,
+               CASE WHEN NEW.extras_type IN ('wide', 'noball') THEN 0 ELSE 1 END,
+               NEW.runs_scored
+                   + CASE WHEN NEW.extras_type IN ('bye', 'legbye') THEN 0 ELSE NEW.extras END,
+               CASE WHEN NEW.wicket_type IS NOT NULL AND lower(NEW.wicket_type) NOT IN (
+                    'run out', 'retired hurt', 'obstructing the field') THEN 1 ELSE 0 END
+        WHERE NEW.bowler_id IS NOT NULL
+        ON CONFLICT(match_id, innings_number, bowler_id) DO UPDATE SET
+            balls = balls + excluded.balls,
+            runs_conceded = runs_conceded + excluded.runs_conceded,
+            wickets = wickets + excluded.wickets;
+    END
+'''
+
+
+def _ball_extras_type(conn):
+    _add_missing_column(conn, 'ball_by_ball', 'extras_type', 'TEXT')
+    conn.execute('DROP TRIGGER IF EXISTS trg_ball_by_ball_scorecard')
+    conn.execute(EXTRAS_TYPE_TRIGGER)
+
+
+# ---- 7 player_team_name_index ----
+
+# Autocomplete within one team: team = ? and a name range, in name order
+PLAYER_TEAM_NAME_INDEX = ('CREATE INDEX IF NOT EXISTS idx_players_team_name '
+                          'ON players(team, name)')
+
+
+def _player_team_name_index(conn):
+    conn.execute(PLAYER_TEAM_NAME_INDEX)
+
+
+# ---- 8 team_strike_rate_index ----
+
+# Top strike rates within one team among players who faced at least 10 balls
+TEAM_STRIKE_RATE_INDEX = ('CREATE INDEX IF NOT EXISTS idx_players_team_strike_rate_qualified '
+                          'ON players(team, strike_rate DESC) WHERE balls >= 10')
+
+
+def _team_strike_rate_index(conn):
+    conn.execute(TEAM_STRIKE_RATE_INDEX)
+
+
+MIGRATIONS = [
+    (1, 'initial_schema', _initial_schema),
+    (2, 'hot_query_indexes', _hot_query_indexes),
+    (3, 'sample_data', _sample_data),
+    (4, 'full_text_search', _full_text_search),
+    (5, 'unique_player_key', _unique_player_key),
+    (6, 'ball_extras_type', _ball_extras_type),
+    (7, 'player_team_name_index', _player_team_name_index),
+    (8, 'team_strike_rate_index', _team_strike_rate_index),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def create_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms REAL
+        )
+    ''')
+
+
+def current_version(conn):
+    """Highest applied migration, 0 for a database that has never migrated"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations in order; returns [(version, name, duration_ms)]"""
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        if version > target:
+            break
+        started = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            create_version_table(conn)
+            # Re-check under the write lock: another process may have run it
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            if not conn.in_transaction:
+                raise RuntimeError(f'Migration {version} {name} committed its own transaction')
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            conn.execute('INSERT INTO schema_version (version, name, duration_ms) VALUES (?, ?, ?)',
+                         (version, name, duration_ms))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append((version, name, duration_ms))
+    return applied
+
+
+def migration_status(conn):
+    """[(version, name, applied_at or None, duration_ms or None)] for every migration"""
+    recorded = {}
+    if current_version(conn):
+        recorded = {row[0]: row[1:] for row in conn.execute(
+            'SELECT version, applied_at, duration_ms FROM schema_version'
+        )}
+    return [(version, name) + tuple(recorded.get(version, (None, None)))
+            for version, name, _ in MIGRATIONS]
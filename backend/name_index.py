@@ -0,0 +1,203 @@
+"""
+In-process name-prefix index for player autocomplete.
+
+Each team keeps a sorted list of "NAME\\0id" keys, so a prefix lookup is
+one bisect per team plus a walk over the matches, and a team filter reads
+a single list. Suggestions across teams merge the per-team ranges in
+(name, team) order. Like Leaderboard, the write path keeps the lists
+current; when the index is invalidated or older than max_age (writes from
+other gunicorn workers are not seen), suggest() returns None so callers
+fall back to the unique (name, team) index in SQL while a background
+reload runs.
+"""
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from itertools import islice
+
+SEPARATOR = '\0'
+
+
+def name_key(name):
+    """Normalized form names are stored and matched in"""
+    return ' '.join(str(name).upper().split())
+
+
+def suggest_query(prefix, limit=10, team=None):
+    """(sql, params) of the SQL fallback, shared with indexes.HOT_QUERIES"""
+    prefix = name_key(prefix)
+    where, params = 'name >= ? AND name < ?', [prefix, prefix + '\uffff']
+    if team is not None:
+        where += ' AND team = ?'
+        params.append(team)
+    # (name, team) is unique, so this order is total and read off the index
+    return f'''
+        SELECT id, name, team FROM players
+        WHERE {where}
+        ORDER BY name, team
+        LIMIT ?
+    ''', params + [limit]
+
+
+def suggest_players(conn, prefix, limit=10, team=None):
+    """SQL fallback: name-prefix range scan on idx_players_name_team, or on
+    idx_players_team_name within one team"""
+    return [dict(row) for row in conn.execute(*suggest_query(prefix, limit, team))]
+
+
+class PlayerNameIndex:
+    """Sorted per-team name keys of the players table"""
+
+    def __init__(self, max_age=60.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._teams = {}
+        self._players = {}
+        self._loaded_at = None
+        self._as_of = None
+        self._loading = False
+        self._pending = []
+        self._stats = {'hits': 0, 'fallbacks': 0, 'reloads': 0}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """Reset locks and reload state copied from a forking parent"""
+        self._lock = threading.Lock()
+        if self._loading:
+            self._loading = False
+            self._pending = []
+            self._loaded_at = None
+
+    def load(self, conn):
+        """Rebuild the index from the players table"""
+        read_at = time.time_ns()
+        teams, players = {}, {}
+        for player_id, name, team in conn.execute('SELECT id, name, team FROM players'):
+            key = f'{name_key(name)}{SEPARATOR}{player_id}'
+            teams.setdefault(team, []).append(key)
+            players[player_id] = (key, team)
+        for keys in teams.values():
+            keys.sort()
+        with self._lock:
+            self._teams = teams
+            self._players = players
+            self._loaded_at = time.monotonic()
+            self._as_of = read_at
+            # Replay writes that committed while the snapshot was being read
+            pending, self._pending = self._pending, []
+            for op, value in pending:
+                if op == 'upsert':
+                    self._upsert(value)
+                else:
+                    self._remove(value)
+            self._stats['reloads'] += 1
+
+    def reload_in_background(self, pool):
+        """Reload from a pooled connection on a daemon thread"""
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+
+        def run():
+            try:
+                with pool.connection() as conn:
+                    self.load(conn)
+            finally:
+                with self._lock:
+                    self._loading = False
+                    self._pending = []
+
+        threading.Thread(target=run, name='name-index-reload', daemon=True).start()
+
+    def is_fresh(self):
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.max_age
+
+    def as_of(self):
+        """time_ns() when the last load began reading; later writes from
+        other workers are not reflected"""
+        return self._as_of
+
+    def invalidate(self):
+        """Mark the index stale so the next lookup falls back to SQL"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _remove(self, player_id):
+        previous = self._players.pop(player_id, None)
+        if previous is None:
+            return
+        key, team = previous
+        keys = self._teams[team]
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
+        if not keys:
+            del self._teams[team]
+
+    def _upsert(self, player):
+        key = f"{name_key(player['name'])}{SEPARATOR}{player['id']}"
+        if self._players.get(player['id']) == (key, player['team']):
+            # Stats-only updates leave the name and team as they were
+            return
+        self._remove(player['id'])
+        self._players[player['id']] = (key, player['team'])
+        insort(self._teams.setdefault(player['team'], []), key)
+
+    def upsert(self, player):
+        """Insert or re-key one player row"""
+        player = {'id': player['id'], 'name': player['name'], 'team': player['team']}
+        with self._lock:
+            if self._loading:
+                self._pending.append(('upsert', player))
+            if self._loaded_at is not None:
+                self._upsert(player)
+
+    def remove(self, player_id):
+        """Drop one player from the index"""
+        with self._lock:
+            if self._loading:
+                self._pending.append(('remove', player_id))
+            if self._loaded_at is not None:
+                self._remove(player_id)
+
+    @staticmethod
+    def _range(keys, prefix, team):
+        for index in range(bisect_left(keys, prefix), len(keys)):
+            key = keys[index]
+            if not key.startswith(prefix):
+                return
+            name, _, player_id = key.rpartition(SEPARATOR)
+            yield name, team, int(player_id)
+
+    def suggest(self, prefix, limit=10, team=None):
+        """Players whose name starts with prefix in name order, or None if stale"""
+        prefix = name_key(prefix)
+        with self._lock:
+            if not self.is_fresh():
+                self._stats['fallbacks'] += 1
+                return None
+            if team is not None:
+                ranges = [self._range(self._teams.get(team, []), prefix, team)]
+            else:
+                ranges = [self._range(keys, prefix, code) for code, keys in self._teams.items()]
+            # Name then team, the order of the SQL fallback
+            result = [{'id': player_id, 'name': name, 'team': code}
+                      for name, code, player_id in islice(heapq.merge(*ranges), limit)]
+            self._stats['hits'] += 1
+            return result
+
+    def stats(self):
+        """Return index counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['players'] = len(self._players)
+            stats['teams'] = len(self._teams)
+        stats['fresh'] = self.is_fresh()
+        stats['max_age'] = self.max_age
+        return stats
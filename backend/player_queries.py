@@ -0,0 +1,104 @@
+"""
+SQL implementations of the player analytics queries.
+
+These serve the analytics endpoints whenever the in-memory leaderboard or
+column store is stale or unavailable, and are the baseline the column store
+is benchmarked against (see benchmarks.py). Percentiles interpolate linearly
+like numpy.percentile so both paths return the same values. UPSERT_PLAYER
+is the statement behind the bulk upsert endpoint.
+"""
+import math
+
+# One statement per player: insert, or update the supplied stats of the row
+# already holding (name, team). NULL stats keep their stored value, or 0 for
+# a new player. version is 1 only for rows this statement created.
+UPSERT_PLAYER = '''
+    INSERT INTO players (name, team, runs, balls, fours, sixes, strike_rate, updated_at)
+    VALUES (:name, :team, COALESCE(:runs, 0), COALESCE(:balls, 0), COALESCE(:fours, 0),
+            COALESCE(:sixes, 0), calculate_strike_rate(COALESCE(:runs, 0), COALESCE(:balls, 0)),
+            :now)
+    ON CONFLICT (name, team) DO UPDATE SET
+        runs = COALESCE(:runs, runs),
+        balls = COALESCE(:balls, balls),
+        fours = COALESCE(:fours, fours),
+        sixes = COALESCE(:sixes, sixes),
+        strike_rate = calculate_strike_rate(COALESCE(:runs, runs), COALESCE(:balls, balls)),
+        updated_at = :now,
+        version = version + 1
+    RETURNING id, name, team, runs, balls, fours, sixes, strike_rate, version
+'''
+
+
+def player_filters(team=None, min_balls=0):
+    """WHERE clause and parameters for the team / minimum-balls filters"""
+    conditions, params = [], []
+    if min_balls >= 10:
+        # The partial index predicate, written out so idx_players_strike_rate_qualified applies
+        conditions.append('balls >= 10')
+    if min_balls > 10 or 0 < min_balls < 10:
+        conditions.append('balls >= ?')
+        params.append(int(min_balls))
+    if team:
+        conditions.append('team = ?')
+        params.append(team)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+
+def top_players_query(column, limit, team=None, min_balls=0):
+    """(sql, params) selecting the top players by a column"""
+    where, params = player_filters(team, min_balls)
+    return f'SELECT * FROM players {where} ORDER BY {column} DESC LIMIT ?', params + [limit]
+
+
+def query_top_players(conn, column, limit, team=None, min_balls=0):
+    """Top players by a column"""
+    return conn.execute(*top_players_query(column, limit, team, min_balls)).fetchall()
+
+
+def query_team_groupby(conn):
+    """Per-team aggregates computed directly from players"""
+    return [dict(row) for row in conn.execute('''
+        SELECT team,
+               COUNT(*) as players_count,
+               SUM(runs) as total_runs,
+               AVG(strike_rate) as avg_strike_rate
+        FROM players
+        GROUP BY team
+        ORDER BY team
+    ''')]
+
+
+def query_percentiles(conn, column, qs, team=None, min_balls=0):
+    """Linearly interpolated percentiles (0-100) of a column"""
+    where, params = player_filters(team, min_balls)
+    count = conn.execute(f'SELECT COUNT(*) FROM players {where}', params).fetchone()[0]
+    if not count:
+        return {}
+    result = {}
+    for q in qs:
+        position = (count - 1) * q / 100
+        lower = math.floor(position)
+        values = [row[0] for row in conn.execute(
+            f'SELECT {column} FROM players {where} ORDER BY {column} LIMIT 2 OFFSET ?',
+            params + [lower]
+        )]
+        upper = values[1] if len(values) > 1 else values[0]
+        result[str(q)] = float(values[0] + (upper - values[0]) * (position - lower))
+    return result
+
+
+def query_rank(conn, player_id, column, team=None, min_balls=0):
+    """(rank, out_of) of a player by column, or None if filtered out"""
+    where, params = player_filters(team, min_balls)
+    player = conn.execute(
+        f'SELECT {column} FROM players {where} {"AND" if where else "WHERE"} id = ?',
+        params + [player_id]
+    ).fetchone()
+    if player is None:
+        return None
+    row = conn.execute(
+        f'SELECT SUM({column} > ?), COUNT(*) FROM players {where}',
+        [player[0]] + params
+    ).fetchone()
+    return row[0] + 1, row[1]
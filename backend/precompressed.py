@@ -0,0 +1,98 @@
+"""
+Static pages served from memory with precompressed variants.
+
+PrecompressedFile reads a file once and keeps the raw bytes next to a gzip
+and, when the brotli package is installed, a brotli copy, each compressed
+at the highest level. Those levels are too slow to apply per request but
+cost nothing once. Every variant has its own strong ETag (a content hash
+plus the encoding), so a cached gzip body never validates a brotli one.
+
+The file is stat()ed at most every check_interval seconds and re-read only
+when its mtime or size changes, so template edits show up without a
+restart while requests normally touch no disk.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+BROTLI_AVAILABLE = brotli is not None
+
+
+class _Variants:
+    """One loaded version of the file in every available encoding"""
+
+    def __init__(self, data, stat):
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.mtime = stat.st_mtime
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        self.bodies = {'identity': data, 'gzip': gzip.compress(data, 9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            self.bodies['br'] = brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+        self.etags = {encoding: digest if encoding == 'identity' else f'{digest}-{encoding}'
+                      for encoding in self.bodies}
+
+    def negotiate(self, accept_encodings):
+        """Smallest encoding the client accepts (a werkzeug Accept), else identity"""
+        best = 'identity'
+        for encoding, body in self.bodies.items():
+            if encoding != 'identity' and accept_encodings.quality(encoding) > 0 and \
+                    len(body) < len(self.bodies[best]):
+                best = encoding
+        return best
+
+
+class PrecompressedFile:
+    """A file kept in memory as raw, gzip and brotli bodies"""
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._variants = None
+        self._checked_at = None
+        self._stats = {'loads': 0, 'served': {}}
+        self._lock = threading.Lock()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Loaded bodies stay shared copy-on-write; only the lock is reset
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The loaded variants, re-read if the file changed; FileNotFoundError if missing"""
+        now = time.monotonic()
+        variants = self._variants
+        if variants is not None and now - self._checked_at < self.check_interval:
+            return variants
+        with self._lock:
+            if self._variants is not None and now - self._checked_at < self.check_interval:
+                return self._variants
+            stat = os.stat(self.path)
+            if self._variants is None or \
+                    self._variants.signature != (stat.st_mtime_ns, stat.st_size):
+                with open(self.path, 'rb') as f:
+                    self._variants = _Variants(f.read(), os.fstat(f.fileno()))
+                self._stats['loads'] += 1
+            self._checked_at = now
+            return self._variants
+
+    def served(self, encoding):
+        served = self._stats['served']
+        served[encoding] = served.get(encoding, 0) + 1
+
+    def stats(self):
+        """Return load counters and variant sizes for monitoring"""
+        stats = {'path': self.path, 'loads': self._stats['loads'],
+                 'served': dict(self._stats['served'])}
+        variants = self._variants
+        if variants is not None:
+            stats['bytes'] = {encoding: len(body) for encoding, body in variants.bodies.items()}
+        return stats
@@ -0,0 +1,478 @@
+"""
+Storage repositories behind the players, matches and dashboard endpoints.
+
+SQLRepository implements every operation once in portable SQL (both SQLite
+3.35+ and PostgreSQL support RETURNING and row-value comparisons). The
+drivers only supply their connection pool, placeholder style and a few
+dialect hooks:
+
+- SQLiteRepository runs on db_pool.ConnectionPool and also keeps the
+  SQLite-only derived tables (match_innings, ball_by_ball, scorecards,
+  team_statistics) in step inside the same transaction. Its schema comes
+  from the versioned migrations in migrations.py.
+- PostgresRepository runs on db_pool.PostgresPool and needs psycopg2.
+
+Methods acquire a pooled connection and commit themselves. Update methods
+also accept an open connection (conn=...) so the write queue can batch them
+into its own transaction. Rows are returned as plain dicts with timestamps
+as strings, so both drivers produce identical JSON. The list methods can
+instead return the driver's rows with just the requested columns, in order,
+for serializers.RowSerializer.tuples().
+"""
+import datetime as dt
+import sqlite3
+from contextlib import contextmanager
+
+try:
+    import psycopg2.extensions
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg2 = None
+
+from player_queries import top_players_query
+from scores import sync_match_scores, delete_match_scores
+from balls import delete_match_balls
+from scorecard import delete_match_scorecards
+from team_stats import read_team_stats
+from archive import with_archived
+
+PLAYER_COLUMNS = ('name', 'team', 'runs', 'balls', 'fours', 'sixes', 'strike_rate')
+MATCH_COLUMNS = ('team1', 'team2', 'score1', 'score2', 'status', 'overs', 'venue', 'match_date')
+# Columns whose change affects the normalized innings of a match
+MATCH_SCORE_COLUMNS = {'team1', 'team2', 'score1', 'score2', 'overs'}
+
+# Read paths of the list and dashboard endpoints; indexes.HOT_QUERIES checks
+# their plans. {table} is a table name or a FROM subquery such as
+# ARCHIVED_MATCHES.
+PAGE_SQL = 'SELECT {columns} FROM {table} ORDER BY id DESC LIMIT ?'
+PAGE_AFTER_SQL = 'SELECT {columns} FROM {table} WHERE id < ? ORDER BY id DESC LIMIT ?'
+GET_SQL = 'SELECT * FROM {table} WHERE id = ?'
+LIVE_MATCH_SQL = "SELECT * FROM matches WHERE status = 'Live' ORDER BY id DESC LIMIT 1"
+LATEST_MATCH_SQL = 'SELECT * FROM matches ORDER BY id DESC LIMIT 1'
+# Live and archived matches; archived match ids can interleave with live ones
+ARCHIVED_MATCHES = with_archived('matches', 'id')
+
+
+class VersionConflict(Exception):
+    """Raised when an If-Match version no longer matches the stored row"""
+
+    def __init__(self, version):
+        super().__init__(f'Current version is {version}')
+        self.version = version
+
+
+class DuplicateKey(Exception):
+    """Raised when a write would store a second row with the same unique key"""
+
+
+class SQLRepository:
+    """Players, matches and dashboard queries in portable SQL"""
+
+    name = None
+    placeholder = '?'
+    # Null-safe inequality operator
+    distinct = 'IS NOT'
+    # Driver exception for constraint violations
+    integrity_error = ()
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    # ---- dialect hooks ----
+
+    def _sql(self, sql):
+        return sql if self.placeholder == '?' else sql.replace('?', self.placeholder)
+
+    def _rows(self, conn, sql, params=()):
+        raise NotImplementedError
+
+    def _values(self, conn, sql, params=()):
+        """Rows as sequences of the selected values, in column order"""
+        raise NotImplementedError
+
+    def _row(self, row):
+        """Plain dict with dates and timestamps as strings"""
+        if row is None:
+            return None
+        row = dict(row)
+        for key, value in row.items():
+            if isinstance(value, (dt.date, dt.datetime)):
+                row[key] = str(value)
+        if 'strike_rate' in row and row['strike_rate'] is not None:
+            # SQLite RETURNING yields whole-number REAL values as integers
+            row['strike_rate'] = float(row['strike_rate'])
+        return row
+
+    def _one(self, conn, sql, params=()):
+        rows = self._rows(conn, sql, params)
+        return self._row(rows[0]) if rows else None
+
+    def _after_match_written(self, conn, match):
+        """Keep derived match data in step; runs in the write transaction
+
+        Returns the match row as it stands afterwards.
+        """
+        return match
+
+    def _after_match_deleted(self, conn, match_id):
+        """Remove derived match data; runs in the delete transaction"""
+
+    @contextmanager
+    def _unique(self, message):
+        """Report unique constraint violations as DuplicateKey(message)"""
+        try:
+            yield
+        except self.integrity_error as e:
+            if 'UNIQUE' not in str(e).upper():
+                raise
+            raise DuplicateKey(message) from e
+
+    @contextmanager
+    def _transaction(self, conn=None):
+        """Yield conn as-is, or a pooled connection committed on success"""
+        if conn is not None:
+            yield conn
+            return
+        with self.pool.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    # ---- shared helpers ----
+
+    def _page(self, table, limit, after_id, columns=None):
+        """One page newest-first plus whether another page exists
+
+        Rows are dicts, or with columns the driver's rows holding just those
+        columns in order (dates and timestamps as the driver returns them).
+        """
+        select = ', '.join(columns) if columns else '*'
+        fetch = self._values if columns else self._rows
+        with self._transaction() as conn:
+            if after_id is None:
+                rows = fetch(conn, PAGE_SQL.format(columns=select, table=table),
+                             (limit + 1,))
+            else:
+                rows = fetch(conn, PAGE_AFTER_SQL.format(columns=select, table=table),
+                             (after_id, limit + 1))
+        page = rows[:limit] if columns else [self._row(row) for row in rows[:limit]]
+        return page, len(rows) > limit
+
+    def _get(self, table, row_id):
+        with self._transaction() as conn:
+            return self._one(conn, GET_SQL.format(table=table), (row_id,))
+
+    def _insert(self, conn, table, values):
+        columns = list(values)
+        return self._one(conn, f'''
+            INSERT INTO {table} ({', '.join(columns)}, updated_at)
+            VALUES ({', '.join('?' * (len(columns) + 1))})
+            RETURNING *
+        ''', [values[column] for column in columns] + [dt.datetime.now()])
+
+    def _partial_update(self, conn, table, row_id, changes, derived=None, expected_versions=None):
+        """Update only the supplied columns with one UPDATE ... RETURNING
+
+        derived maps extra columns to (sql_expression, params) computed in the
+        same statement. Rows whose supplied columns already hold the new
+        values are not written. When expected_versions is given the row is
+        only written if its version is one of them. Returns the updated row,
+        or None if nothing changed (missing row, version conflict or no-op).
+        """
+        assignments = [f'{column} = ?' for column in changes]
+        params = list(changes.values())
+        for column, (expression, expression_params) in (derived or {}).items():
+            assignments.append(f'{column} = {expression}')
+            params.extend(expression_params)
+        assignments.append('updated_at = ?')
+        params.append(dt.datetime.now())
+        assignments.append('version = version + 1')
+
+        conditions = ['id = ?']
+        params.append(row_id)
+        if expected_versions is not None:
+            if not expected_versions:
+                return None
+            conditions.append(f"version IN ({', '.join('?' * len(expected_versions))})")
+            params.extend(expected_versions)
+        conditions.append('(' + ' OR '.join(f'{column} {self.distinct} ?'
+                                            for column in changes) + ')')
+        params.extend(changes.values())
+
+        return self._one(conn, f'''
+            UPDATE {table}
+            SET {', '.join(assignments)}
+            WHERE {' AND '.join(conditions)}
+            RETURNING *
+        ''', params)
+
+    def _unchanged(self, conn, table, row_id, expected_versions, missing):
+        """Resolve an update that wrote nothing: no-op, conflict or missing row"""
+        row = self._one(conn, f'SELECT * FROM {table} WHERE id = ?', (row_id,))
+        if row is None:
+            raise LookupError(missing)
+        if expected_versions is not None and row['version'] not in expected_versions:
+            raise VersionConflict(row['version'])
+        return row, False
+
+    @staticmethod
+    def _strike_rate_expression(changes):
+        """SQL expression recomputing strike_rate from new or existing runs/balls"""
+        runs = '?' if 'runs' in changes else 'runs'
+        balls = '?' if 'balls' in changes else 'balls'
+        params = [changes[column] for column in ('runs', 'balls') if column in changes]
+        return f'calculate_strike_rate({runs}, {balls})', params
+
+    # ---- players ----
+
+    def list_players(self, limit, after_id=None, columns=None):
+        """(players, has_more) for one keyset page, newest first"""
+        return self._page('players', limit, after_id, columns)
+
+    def get_player(self, player_id):
+        return self._get('players', player_id)
+
+    def create_player(self, values):
+        """Insert a player from PLAYER_COLUMNS values; returns the stored row"""
+        with self._unique('A player with this name and team already exists'), \
+                self._transaction() as conn:
+            return self._insert(conn, 'players', values)
+
+    def update_player(self, player_id, changes, expected_versions=None, conn=None):
+        """Apply a partial player update; returns (player, changed)"""
+        derived = {}
+        if 'runs' in changes or 'balls' in changes:
+            derived['strike_rate'] = self._strike_rate_expression(changes)
+        with self._unique('A player with this name and team already exists'), \
+                self._transaction(conn) as conn:
+            player = self._partial_update(conn, 'players', player_id, changes, derived,
+                                          expected_versions) if changes else None
+            if player:
+                return player, True
+            return self._unchanged(conn, 'players', player_id, expected_versions,
+                                   'Player not found')
+
+    def delete_player(self, player_id):
+        """Delete a player; returns the deleted row or None"""
+        with self._transaction() as conn:
+            return self._one(conn, 'DELETE FROM players WHERE id = ? RETURNING *', (player_id,))
+
+    # ---- matches ----
+
+    def list_matches(self, limit, after_id=None, columns=None):
+        """(matches, has_more) for one keyset page, newest first"""
+        return self._page('matches', limit, after_id, columns)
+
+    def get_match(self, match_id):
+        return self._get('matches', match_id)
+
+    def create_match(self, values):
+        """Insert a match from MATCH_COLUMNS values; returns the stored row"""
+        with self._transaction() as conn:
+            match = self._insert(conn, 'matches', values)
+            return self._after_match_written(conn, match)
+
+    def update_match(self, match_id, changes, expected_versions=None, conn=None):
+        """Apply a partial match update; returns (match, changed)"""
+        with self._transaction(conn) as conn:
+            match = self._partial_update(conn, 'matches', match_id, changes,
+                                         expected_versions=expected_versions) if changes else None
+            if match:
+                if changes.keys() & MATCH_SCORE_COLUMNS:
+                    match = self._after_match_written(conn, match)
+                return match, True
+            return self._unchanged(conn, 'matches', match_id, expected_versions,
+                                   'Match not found')
+
+    def delete_match(self, match_id):
+        """Delete a match and its derived data; returns the deleted row or None"""
+        with self._transaction() as conn:
+            match = self._one(conn, 'DELETE FROM matches WHERE id = ? RETURNING *', (match_id,))
+            if match is not None:
+                self._after_match_deleted(conn, match_id)
+            return match
+
+    # ---- dashboard ----
+
+    def live_match(self):
+        """The latest live match, else the latest match, else None"""
+        with self._transaction() as conn:
+            return (self._one(conn, LIVE_MATCH_SQL)
+                    or self._one(conn, LATEST_MATCH_SQL))
+
+    def top_players(self, column, limit, team=None, min_balls=0):
+        """Top players by runs or strike_rate with optional filters"""
+        if column not in ('runs', 'strike_rate'):
+            raise ValueError(f'Cannot rank players by {column}')
+        with self._transaction() as conn:
+            rows = self._rows(conn, *top_players_query(column, limit, team, min_balls))
+        return [self._row(row) for row in rows]
+
+    def team_statistics(self):
+        """players_count, total_runs and avg_strike_rate per team"""
+        with self._transaction() as conn:
+            rows = self._rows(conn, '''
+                SELECT team, COUNT(*) as players_count, SUM(runs) as total_runs,
+                       AVG(strike_rate) as avg_strike_rate
+                FROM players
+                GROUP BY team
+                ORDER BY team
+            ''')
+        return [self._row(row) for row in rows]
+
+    def stats(self):
+        """Driver name and pool statistics for monitoring"""
+        return {'backend': self.name, 'pool': self.pool.stats()}
+
+
+class SQLiteRepository(SQLRepository):
+    """Repository on the pooled SQLite database
+
+    With archive=True, match reads also cover the archived_ views that
+    archive.MatchArchive attaches to every pooled connection.
+    """
+
+    name = 'sqlite'
+    integrity_error = sqlite3.IntegrityError
+
+    def __init__(self, pool, archive=False):
+        super().__init__(pool)
+        self.archive = archive
+
+    def _rows(self, conn, sql, params=()):
+        return conn.execute(sql, params).fetchall()
+
+    # sqlite3.Row is already a sequence of the values
+    _values = _rows
+
+    def _after_match_written(self, conn, match):
+        sync_match_scores(conn, match['id'], match['team1'], match['team2'],
+                          match['score1'], match['score2'], match['overs'])
+        # sync_match_scores also refreshes balls_bowled
+        return self._one(conn, 'SELECT * FROM matches WHERE id = ?', (match['id'],))
+
+    def _after_match_deleted(self, conn, match_id):
+        delete_match_scores(conn, match_id)
+        delete_match_balls(conn, match_id)
+        delete_match_scorecards(conn, match_id)
+
+    def list_matches(self, limit, after_id=None, columns=None):
+        if not self.archive:
+            return super().list_matches(limit, after_id, columns)
+        # Archived matches can have any id, so page over both sources
+        return self._page(ARCHIVED_MATCHES, limit, after_id, columns)
+
+    def get_match(self, match_id):
+        match = super().get_match(match_id)
+        if match is None and self.archive:
+            with self._transaction() as conn:
+                match = self._one(conn, GET_SQL.format(table='archived_matches'),
+                                  (match_id,))
+        return match
+
+    def team_statistics(self):
+        # Maintained incrementally by triggers, so no scan of players
+        with self._transaction() as conn:
+            return read_team_stats(conn)
+
+
+POSTGRES_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS players (
+        id BIGSERIAL PRIMARY KEY,
+        name TEXT NOT NULL,
+        team TEXT NOT NULL,
+        runs INTEGER DEFAULT 0,
+        balls INTEGER DEFAULT 0,
+        fours INTEGER DEFAULT 0,
+        sixes INTEGER DEFAULT 0,
+        strike_rate DOUBLE PRECISION DEFAULT 0.0,
+        version INTEGER NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS matches (
+        id BIGSERIAL PRIMARY KEY,
+        team1 TEXT NOT NULL,
+        team2 TEXT NOT NULL,
+        score1 TEXT DEFAULT '0-0',
+        score2 TEXT DEFAULT '0-0',
+        status TEXT DEFAULT 'Upcoming',
+        overs TEXT DEFAULT '0.0',
+        venue TEXT,
+        match_date DATE,
+        version INTEGER NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # Same rounding as app.calculate_strike_rate
+    '''
+    CREATE OR REPLACE FUNCTION calculate_strike_rate(runs BIGINT, balls BIGINT)
+    RETURNS DOUBLE PRECISION AS $$
+        SELECT CASE WHEN balls > 0
+                    THEN round(runs * 100.0 / balls, 2)::DOUBLE PRECISION
+                    ELSE 0.0 END
+    $$ LANGUAGE SQL IMMUTABLE
+    ''',
+    # Same hot-query indexes as indexes.INDEXES
+    'CREATE INDEX IF NOT EXISTS idx_players_team_runs ON players(team, runs DESC, strike_rate)',
+    'CREATE INDEX IF NOT EXISTS idx_players_runs ON players(runs DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_players_strike_rate_qualified '
+    'ON players(strike_rate DESC) WHERE balls >= 10',
+    'CREATE INDEX IF NOT EXISTS idx_players_team_strike_rate_qualified '
+    'ON players(team, strike_rate DESC) WHERE balls >= 10',
+    "CREATE INDEX IF NOT EXISTS idx_matches_live ON matches(id) WHERE status = 'Live'",
+]
+# Advisory lock serializing create_schema() across processes and hosts;
+# concurrent CREATE OR REPLACE FUNCTION fails with "tuple concurrently updated"
+POSTGRES_SCHEMA_LOCK = 0x43524B54
+
+
+class PostgresRepository(SQLRepository):
+    """Repository on a bounded pool of PostgreSQL connections"""
+
+    name = 'postgres'
+    placeholder = '%s'
+    distinct = 'IS DISTINCT FROM'
+
+    @staticmethod
+    def create_schema(conn):
+        """Create the players and matches tables, indexes and SQL functions
+
+        Runs as one transaction under an advisory lock, so concurrent callers
+        apply it one after another.
+        """
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (POSTGRES_SCHEMA_LOCK,))
+            for statement in POSTGRES_SCHEMA:
+                cursor.execute(statement)
+        conn.commit()
+
+    @staticmethod
+    def schema_exists(conn):
+        """True once create_schema() has committed"""
+        with conn.cursor() as cursor:
+            # The function is created in the same transaction as the tables
+            cursor.execute("SELECT to_regclass('players') IS NOT NULL "
+                           "AND to_regclass('matches') IS NOT NULL "
+                           "AND to_regprocedure('calculate_strike_rate(bigint, bigint)') "
+                           "IS NOT NULL AS ready")
+            ready = cursor.fetchone()['ready']
+        conn.rollback()
+        return ready
+
+    def _rows(self, conn, sql, params=()):
+        with conn.cursor() as cursor:
+            cursor.execute(self._sql(sql), list(params))
+            return cursor.fetchall() if cursor.description else []
+
+    def _values(self, conn, sql, params=()):
+        # Plain tuples instead of the pool's RealDictCursor rows
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+            cursor.execute(self._sql(sql), list(params))
+            return cursor.fetchall()
@@ -0,0 +1,152 @@
+"""
+In-process cache of encoded GET responses for the dashboard and list endpoints.
+
+Entries are keyed by route and query arguments. Each one stores the
+data-version ETag it was rendered under (see data_versions.py) and the
+tables it depends on. A lookup only hits when the entry's ETag equals the
+current one, so a write to players drops exactly the entries that read
+players, including writes made by other gunicorn workers. Writes in this
+process also drop the entries right away with invalidate(), releasing the
+memory before the next lookup.
+
+Entries expire after ttl seconds, which bounds staleness from writes that
+bypass the app. The cache evicts the least recently used entries once it
+holds more than max_entries or max_bytes. Dashboards poll together, so
+concurrent misses for the same key and ETag wait for one render instead
+of all running the view's queries.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response
+
+
+class _Entry:
+    __slots__ = ('etag', 'tables', 'expires_at', 'body', 'status', 'mimetype')
+
+    def __init__(self, etag, tables, expires_at, body, status, mimetype):
+        self.etag = etag
+        self.tables = tables
+        self.expires_at = expires_at
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+
+
+class ResponseCache:
+    """LRU + TTL cache of rendered responses validated by data version"""
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024, ttl=60.0,
+                 render_timeout=10.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.render_timeout = render_timeout
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'stores': 0,
+                       'evictions': 0, 'expirations': 0, 'invalidations': 0}
+        self._reset()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Also runs after fork: renders in flight stay with the parent
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._rendering = {}
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    def _lookup(self, key, etag):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.etag != etag:
+            # Written since, possibly by another worker
+            self._drop(key)
+            self._stats['invalidations'] += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._drop(key)
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, etag, tables, response):
+        body = response.get_data()
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(etag, frozenset(tables), time.monotonic() + self.ttl,
+                                        body, response.status_code, response.mimetype)
+            self._bytes += len(body)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def get_or_render(self, key, etag, tables, render):
+        """(response, current) from the cache, or from render() on a miss
+
+        render() returns (response, current); only current, non-streamed
+        responses are stored.
+        """
+        waited = False
+        while True:
+            with self._lock:
+                entry = self._lookup(key, etag)
+                if entry is not None:
+                    self._stats['hits'] += 1
+                    return Response(entry.body, status=entry.status,
+                                    mimetype=entry.mimetype), True
+                pending = self._rendering.get((key, etag))
+                if pending is None or waited:
+                    self._stats['misses'] += 1
+                    if pending is None:
+                        pending = self._rendering[(key, etag)] = threading.Event()
+                        leader = True
+                    else:
+                        # The first render is taking too long; render alongside it
+                        leader = False
+                    break
+                self._stats['coalesced'] += 1
+            pending.wait(self.render_timeout)
+            waited = True
+
+        try:
+            response, current = render()
+            if current and not response.is_streamed:
+                self._store(key, etag, tables, response)
+            return response, current
+        finally:
+            if leader:
+                with self._lock:
+                    self._rendering.pop((key, etag), None)
+                pending.set()
+
+    def invalidate(self, tables):
+        """Drop every entry that depends on any of tables"""
+        tables = set(tables)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.tables & tables]
+            for key in stale:
+                self._drop(key)
+            self._stats['invalidations'] += len(stale)
+
+    def stats(self):
+        """Return cache counters and size for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(entries=len(self._entries), bytes=self._bytes,
+                         max_entries=self.max_entries, max_bytes=self.max_bytes, ttl=self.ttl)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
@@ -0,0 +1,128 @@
+"""
+Batting and bowling scorecards derived incrementally from ball_by_ball.
+
+An AFTER INSERT trigger on ball_by_ball folds each new delivery into
+batting_scorecard (runs, balls, 4s, 6s per batter) and bowling_scorecard
+(legal balls, runs conceded, wickets per bowler), so reading a card never
+scans the match's deliveries. extras_type (balls.py) decides what counts
+as a ball and which extras the bowler is charged with. Duplicate
+deliveries dropped by INSERT OR IGNORE do not fire the trigger.
+rebuild_scorecards() recomputes both tables from the delivery log for
+recovery. The tables and the trigger are created by the schema migrations
+(migrations.py).
+"""
+
+# Dismissals not credited to the bowler
+NON_BOWLER_WICKETS = ('run out', 'retired hurt', 'obstructing the field')
+
+# Sortable position of a delivery within an innings
+BALL_SEQUENCE = '({alias}.over_number * 1000 + {alias}.ball_number)'
+
+_BOWLER_WICKET = (
+    "CASE WHEN {alias}.wicket_type IS NOT NULL AND lower({alias}.wicket_type) NOT IN ("
+    + ', '.join(f"'{kind}'" for kind in NON_BOWLER_WICKETS) + ") THEN 1 ELSE 0 END"
+)
+# A wide is not a ball faced; neither a wide nor a no-ball is a legal delivery
+_BALL_FACED = "CASE WHEN {alias}.extras_type IS 'wide' THEN 0 ELSE 1 END"
+_LEGAL_BALL = "CASE WHEN {alias}.extras_type IN ('wide', 'noball') THEN 0 ELSE 1 END"
+# Byes and leg byes are not charged to the bowler
+_RUNS_CONCEDED = (
+    "{alias}.runs_scored + CASE WHEN {alias}.extras_type IN ('bye', 'legbye') "
+    "THEN 0 ELSE {alias}.extras END"
+)
+_BATTER_OUT = (
+    "CASE WHEN {alias}.wicket_type IS NOT NULL AND coalesce({alias}.wicket_player_id, "
+    "{alias}.batsman_id) = {alias}.batsman_id THEN 1 ELSE 0 END"
+)
+
+
+def rebuild_scorecards(conn, match_id=None):
+    """Recompute scorecards from ball_by_ball, for one match or all"""
+    where = 'WHERE b.match_id = ?' if match_id is not None else ''
+    params = (match_id,) if match_id is not None else ()
+
+    conn.execute(f'DELETE FROM batting_scorecard {where.replace("b.", "")}', params)
+    conn.execute(f'DELETE FROM bowling_scorecard {where.replace("b.", "")}', params)
+    conn.execute(f'''
+        INSERT INTO batting_scorecard (match_id, innings_number, batsman_id, runs, balls,
+                                       fours, sixes, dismissed, last_sequence)
+        SELECT b.match_id, b.innings_number, b.batsman_id,
+               SUM(b.runs_scored), SUM({_BALL_FACED.format(alias='b')}),
+               SUM(b.runs_scored = 4), SUM(b.runs_scored = 6),
+               MAX({_BATTER_OUT.format(alias='b')}) OR EXISTS (
+                   SELECT 1 FROM ball_by_ball w
+                   WHERE w.match_id = b.match_id AND w.innings_number = b.innings_number
+                     AND w.wicket_type IS NOT NULL AND w.wicket_player_id = b.batsman_id
+               ),
+               MAX({BALL_SEQUENCE.format(alias='b')})
+        FROM ball_by_ball b
+        {where + ' AND' if where else 'WHERE'} b.batsman_id IS NOT NULL
+        GROUP BY b.match_id, b.innings_number, b.batsman_id
+    ''', params)
+    conn.execute(f'''
+        INSERT INTO bowling_scorecard (match_id, innings_number, bowler_id, balls,
+                                       runs_conceded, wickets)
+        SELECT b.match_id, b.innings_number, b.bowler_id, SUM({_LEGAL_BALL.format(alias='b')}),
+               SUM({_RUNS_CONCEDED.format(alias='b')}), SUM({_BOWLER_WICKET.format(alias='b')})
+        FROM ball_by_ball b
+        {where + ' AND' if where else 'WHERE'} b.bowler_id IS NOT NULL
+        GROUP BY b.match_id, b.innings_number, b.bowler_id
+    ''', params)
+
+
+def delete_match_scorecards(conn, match_id):
+    """Remove scorecards of a deleted match"""
+    conn.execute('DELETE FROM batting_scorecard WHERE match_id = ?', (match_id,))
+    conn.execute('DELETE FROM bowling_scorecard WHERE match_id = ?', (match_id,))
+
+
+def current_innings(conn, match_id):
+    """Latest innings with recorded batting, or None"""
+    return conn.execute(CURRENT_INNINGS_SQL, (match_id,)).fetchone()[0]
+
+
+# Read-path SQL, shared with indexes.HOT_QUERIES
+CURRENT_INNINGS_SQL = 'SELECT MAX(innings_number) FROM batting_scorecard WHERE match_id = ?'
+CURRENT_BATTERS_SQL = '''
+    SELECT p.id, p.name, s.runs, s.balls, s.fours, s.sixes
+    FROM batting_scorecard s
+    JOIN players p ON p.id = s.batsman_id
+    WHERE s.match_id = ? AND s.innings_number = ? AND s.dismissed = 0
+    ORDER BY s.last_sequence DESC
+    LIMIT ?
+'''
+# {prefix} is '' for live matches and 'archived_' for archived ones
+BATTING_CARD_SQL = '''
+    SELECT s.innings_number, s.batsman_id, p.name, s.runs, s.balls, s.fours,
+           s.sixes, s.dismissed
+    FROM {prefix}batting_scorecard s
+    LEFT JOIN players p ON p.id = s.batsman_id
+    WHERE s.match_id = ?
+    ORDER BY s.innings_number
+'''
+BOWLING_CARD_SQL = '''
+    SELECT s.innings_number, s.bowler_id, p.name, s.balls, s.runs_conceded, s.wickets
+    FROM {prefix}bowling_scorecard s
+    LEFT JOIN players p ON p.id = s.bowler_id
+    WHERE s.match_id = ?
+    ORDER BY s.innings_number
+'''
+
+
+def current_batters(conn, match_id, limit=2):
+    """Not-out batters of the current innings, most recently on strike first"""
+    innings = current_innings(conn, match_id)
+    if innings is None:
+        return []
+    return conn.execute(CURRENT_BATTERS_SQL, (match_id, innings, limit)).fetchall()
+
+
+def match_scorecard(conn, match_id, archived=False):
+    """Batting and bowling cards for every innings of a match
+
+    archived=True reads an archived match through the archived_ views.
+    """
+    prefix = 'archived_' if archived else ''
+    batting = conn.execute(BATTING_CARD_SQL.format(prefix=prefix), (match_id,)).fetchall()
+    bowling = conn.execute(BOWLING_CARD_SQL.format(prefix=prefix), (match_id,)).fetchall()
+    return batting, bowling
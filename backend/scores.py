@@ -0,0 +1,147 @@
+"""
+Parsing and normalized storage of match scores.
+
+Scores arrive as free text such as '210-3', '210/3', '350-6d' or '207&250'
+(two completed innings) and overs as '45.2'. parse_score() and
+parse_overs() turn them into integers, and sync_match_scores() keeps the
+match_innings table and matches.balls_bowled in step with every match write
+so scoring aggregates can run as indexed SQL. TEAM_SCORING_SQL and
+VENUE_SCORING_SQL are those aggregates, over live and archived matches.
+"""
+import re
+
+BALLS_PER_OVER = 6
+ALL_OUT_WICKETS = 10
+
+# Each source is aggregated on its own so the live tables are read through
+# their covering indexes; the outer query only combines one row per source.
+# Archived rows are skipped when the same match is still live.
+TEAM_SCORING_SQL = '''
+    SELECT team,
+           SUM(innings) as innings,
+           MAX(highest_total) as highest_total,
+           ROUND(SUM(total_runs) * 1.0 / SUM(innings), 2) as average_total
+    FROM (
+        SELECT team, COUNT(*) as innings, MAX(runs) as highest_total,
+               SUM(runs) as total_runs
+        FROM main.match_innings
+        GROUP BY team
+        UNION ALL
+        SELECT team, COUNT(*), MAX(runs), SUM(runs)
+        FROM archived_match_innings
+        WHERE match_id NOT IN (SELECT match_id FROM main.match_innings)
+        GROUP BY team
+    ) sources
+    GROUP BY team
+    ORDER BY highest_total DESC
+'''
+VENUE_SCORING_SQL = '''
+    SELECT venue,
+           SUM(matches) as matches,
+           MAX(highest_first_innings) as highest_first_innings,
+           ROUND(SUM(total_runs) * 1.0 / SUM(matches), 2) as average_first_innings
+    FROM (
+        SELECT m.venue, COUNT(*) as matches, MAX(i.runs) as highest_first_innings,
+               SUM(i.runs) as total_runs
+        FROM main.match_innings i
+        JOIN main.matches m ON m.id = i.match_id
+        WHERE i.team_slot = 1 AND i.innings_number = 1
+        GROUP BY m.venue
+        UNION ALL
+        SELECT am.venue, COUNT(*), MAX(ai.runs), SUM(ai.runs)
+        FROM archived_match_innings ai
+        JOIN archived_matches am ON am.id = ai.match_id
+        WHERE ai.team_slot = 1 AND ai.innings_number = 1
+          AND ai.match_id NOT IN (SELECT match_id FROM main.match_innings)
+          AND am.id NOT IN (SELECT id FROM main.matches)
+        GROUP BY am.venue
+    ) sources
+    GROUP BY venue
+    ORDER BY average_first_innings DESC
+'''
+
+_INNINGS_RE = re.compile(r'^\s*(\d+)\s*(?:[-/]\s*(\d+))?\s*(d|dec)?\s*$', re.IGNORECASE)
+_OVERS_RE = re.compile(r'^\s*(\d+)(?:\.(\d*))?\s*$')
+
+
+def parse_innings(text):
+    """Parse one innings like '210-3' into (runs, wickets, declared)"""
+    match = _INNINGS_RE.match(text)
+    if not match:
+        raise ValueError(f'Invalid innings score: {text!r}')
+    runs = int(match.group(1))
+    # A bare total ('207') is the conventional notation for all out
+    wickets = int(match.group(2)) if match.group(2) is not None else ALL_OUT_WICKETS
+    if wickets > ALL_OUT_WICKETS:
+        raise ValueError(f'Invalid wicket count in score: {text!r}')
+    return runs, wickets, bool(match.group(3))
+
+
+def parse_score(score):
+    """Parse a score string into a list of (runs, wickets, declared) per innings"""
+    if score is None or not str(score).strip():
+        return []
+    return [parse_innings(part) for part in str(score).split('&')]
+
+
+def parse_overs(overs):
+    """Convert overs notation ('45.2') into balls bowled (272)"""
+    if overs is None or not str(overs).strip():
+        return 0
+    match = _OVERS_RE.match(str(overs))
+    if not match:
+        raise ValueError(f'Invalid overs: {overs!r}')
+    whole, part = match.groups()
+    balls = int(part) if part else 0
+    if balls >= BALLS_PER_OVER:
+        raise ValueError(f'Invalid overs: {overs!r}')
+    return int(whole) * BALLS_PER_OVER + balls
+
+
+def validate_match_scores(score1, score2, overs):
+    """Raise ValueError if any score or overs string cannot be parsed"""
+    parse_score(score1)
+    parse_score(score2)
+    parse_overs(overs)
+
+
+def sync_match_scores(conn, match_id, team1, team2, score1, score2, overs):
+    """Rewrite the normalized score rows for one match"""
+    innings_rows = []
+    for slot, team, score in ((1, team1, score1), (2, team2, score2)):
+        for number, (runs, wickets, declared) in enumerate(parse_score(score), start=1):
+            if runs == 0 and wickets == 0:
+                # '0-0' is the placeholder for an innings not yet started
+                continue
+            innings_rows.append((match_id, slot, team, number, runs, wickets, int(declared)))
+
+    conn.execute('DELETE FROM match_innings WHERE match_id = ?', (match_id,))
+    conn.executemany('''
+        INSERT INTO match_innings (match_id, team_slot, team, innings_number, runs, wickets, declared)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', innings_rows)
+    conn.execute('UPDATE matches SET balls_bowled = ? WHERE id = ?', (parse_overs(overs), match_id))
+
+
+def delete_match_scores(conn, match_id):
+    """Remove normalized score rows for a deleted match"""
+    conn.execute('DELETE FROM match_innings WHERE match_id = ?', (match_id,))
+
+
+def backfill_match_scores(conn, only_missing=True):
+    """Populate match_innings for existing matches; returns (done, failed ids)
+
+    Runs in the caller's transaction and does not commit.
+    """
+    query = 'SELECT id, team1, team2, score1, score2, overs FROM matches'
+    if only_missing:
+        query += ' WHERE id NOT IN (SELECT DISTINCT match_id FROM match_innings)'
+
+    done, failed = 0, []
+    for row in conn.execute(query).fetchall():
+        try:
+            sync_match_scores(conn, *row)
+            done += 1
+        except ValueError:
+            failed.append(row[0])
+    return done, failed
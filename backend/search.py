@@ -0,0 +1,77 @@
+"""
+Full-text search over players, matches and ball commentary with SQLite FTS5.
+
+Each FTS5 table is an external-content index over its source table, so
+the text is stored once and the index only holds tokens. The indexes and
+their triggers are created by the full_text_search migration. Triggers on the
+source tables keep the indexes in step with every write path, including
+bulk upserts and the archive job (archived matches leave the index).
+Prefix indexes on 1-3 characters serve search-as-you-type.
+
+search() turns free text into a prefix query ("v koh" matches "V. KOHLI",
+whose tokens are "v" and "kohli") and orders results by bm25 with
+per-column weights. FTS5 reads the newest MAX_CANDIDATES matches in rowid
+order and only those are scored, so a one-letter prefix that matches most
+rows costs no more than a narrow query; only the top rows are joined to
+their source table.
+"""
+import re
+
+SEARCH_KINDS = {
+    'players': 'players_fts',
+    'matches': 'matches_fts',
+    'commentary': 'commentary_fts',
+}
+MAX_QUERY_TERMS = 8
+# Matches scored per query; a broad prefix such as 'k' matches most rows
+MAX_CANDIDATES = 1000
+
+
+def fts_query(text):
+    """FTS5 prefix query for free text, or None if it has no terms
+
+    Terms are quoted, so FTS5 operators in user input are matched as text.
+    """
+    terms = re.findall(r'\w+', text.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+# Best matches by bm25 among the newest MAX_CANDIDATES matches, ranked
+# before the join
+TOP_MATCHES = '''(
+    SELECT rowid, rank FROM (
+        SELECT rowid, rank FROM {fts} WHERE {fts} MATCH ? ORDER BY rowid DESC LIMIT ?
+    ) candidates
+    ORDER BY rank LIMIT ?
+) f'''
+
+SEARCH_SQL = {
+    'players': f'''
+        SELECT p.id, p.name, p.team, p.runs, p.balls, p.strike_rate, f.rank AS score
+        FROM {TOP_MATCHES.format(fts='players_fts')} JOIN players p ON p.id = f.rowid
+        ORDER BY f.rank
+    ''',
+    'matches': f'''
+        SELECT m.id, m.team1, m.team2, m.venue, m.status, m.match_date, f.rank AS score
+        FROM {TOP_MATCHES.format(fts='matches_fts')} JOIN matches m ON m.id = f.rowid
+        ORDER BY f.rank
+    ''',
+    'commentary': f'''
+        SELECT c.match_id, c.innings_number, c.over_number, c.ball_number, c.commentary,
+               f.rank AS score
+        FROM {TOP_MATCHES.format(fts='commentary_fts')} JOIN ball_commentary c ON c.id = f.rowid
+        ORDER BY f.rank
+    ''',
+}
+
+
+def search(conn, text, limit=10, kinds=tuple(SEARCH_KINDS)):
+    """{kind: rows} best matches first, or None if text has no terms"""
+    query = fts_query(text)
+    if query is None:
+        return None
+    # bm25 scores are negative; lower is a better match
+    return {kind: conn.execute(SEARCH_SQL[kind], (query, MAX_CANDIDATES, limit)).fetchall()
+            for kind in kinds}
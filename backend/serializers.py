@@ -0,0 +1,146 @@
+"""
+JSON encoding shared by every API response.
+
+RowSerializer maps a row to a dict holding a fixed set of columns in a
+fixed order. The row can be a cursor tuple, a sqlite3.Row or a repository
+dict. Each row is one itemgetter call and one zip, instead of a
+field-by-field copy per endpoint.
+
+RowJSONProvider replaces Flask's default provider, so every jsonify()
+goes through dumps(). dumps() uses orjson when it is installed and falls
+back to the stdlib encoder otherwise. Keys keep their insertion (column)
+order rather than being sorted. sqlite3.Row values are encoded as
+objects, so query results can be returned without a copy. Dates and
+timestamps are encoded as str() values, the same form the repositories
+return.
+
+orjson is optional: without it the stdlib encoder produces equivalent
+JSON, only slower.
+"""
+import dataclasses
+import datetime as dt
+import decimal
+import json
+import sqlite3
+import uuid
+from operator import itemgetter
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ORJSON_AVAILABLE = orjson is not None
+
+# Public columns of each table; the row version travels in the ETag
+PLAYER_FIELDS = ('id', 'name', 'team', 'runs', 'balls', 'fours', 'sixes', 'strike_rate',
+                 'created_at', 'updated_at')
+MATCH_FIELDS = ('id', 'team1', 'team2', 'score1', 'score2', 'status', 'overs', 'venue',
+                'match_date', 'created_at', 'updated_at')
+# Player columns held by every ranking source (snapshot, column store,
+# leaderboard and SQL), so a ranking has one shape whichever source answers
+LEADERBOARD_FIELDS = ('id', 'name', 'team', 'runs', 'balls', 'fours', 'sixes', 'strike_rate')
+
+
+def _default(value):
+    """Encode the types neither encoder handles natively"""
+    if isinstance(value, sqlite3.Row):
+        return dict(zip(value.keys(), value))
+    if isinstance(value, (dt.date, dt.datetime, dt.time, decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    if hasattr(value, 'tolist'):
+        # NumPy scalars and arrays
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+_stdlib_encoder = json.JSONEncoder(default=_default, ensure_ascii=False,
+                                   separators=(',', ':'))
+_stdlib_indented = json.JSONEncoder(default=_default, ensure_ascii=False, indent=2)
+
+
+def stdlib_dumps(obj, indent=False):
+    """UTF-8 JSON bytes from the stdlib encoder"""
+    return (_stdlib_indented if indent else _stdlib_encoder).encode(obj).encode()
+
+
+if ORJSON_AVAILABLE:
+    # Dates go through _default so both encoders format them with str()
+    ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME |
+                      orjson.OPT_SERIALIZE_NUMPY)
+
+    def orjson_dumps(obj, indent=False):
+        """UTF-8 JSON bytes from orjson"""
+        return orjson.dumps(obj, default=_default,
+                            option=ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+
+    dumps = orjson_dumps
+    loads = orjson.loads
+else:
+    orjson_dumps = None
+    dumps = stdlib_dumps
+    loads = json.loads
+
+
+class RowSerializer:
+    """Maps rows to dicts with a fixed set of columns in a fixed order"""
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        if len(self.columns) == 1:
+            column = self.columns[0]
+            self._values = lambda row: (row[column],)
+        else:
+            self._values = itemgetter(*self.columns)
+
+    def __call__(self, row):
+        """One mapping row (sqlite3.Row or dict) as a dict, or None"""
+        if row is None:
+            return None
+        return dict(zip(self.columns, self._values(row)))
+
+    def many(self, rows):
+        """A list of mapping rows as dicts"""
+        columns, values = self.columns, self._values
+        return [dict(zip(columns, values(row))) for row in rows]
+
+    def tuples(self, rows):
+        """Cursor tuples already selected in column order as dicts"""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in rows]
+
+
+player_json = RowSerializer(PLAYER_FIELDS)
+match_json = RowSerializer(MATCH_FIELDS)
+leaderboard_json = RowSerializer(LEADERBOARD_FIELDS)
+
+
+class RowJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps() and loads()"""
+
+    mimetype = 'application/json'
+    # None: indented in debug mode only, as with Flask's default provider
+    compact = None
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for stdlib options, e.g. Flask's session serializer
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumps(obj, indent=indent), mimetype=self.mimetype)
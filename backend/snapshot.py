@@ -0,0 +1,354 @@
+"""
+Memory-mapped analytics snapshot shared by every gunicorn worker.
+
+write_snapshot() serializes the players ordered by runs, a strike-rate
+ordering and the team_statistics aggregates into one fixed-layout binary
+file. AnalyticsSnapshot maps that file read-only, so all workers share the
+same page-cache pages instead of each building its own leaderboard, and
+records are decoded with struct only when a query reaches them.
+
+A new snapshot is written to a temporary file and moved into place with
+os.replace(), so readers see either the old file or the new one, never a
+partial write. Readers stat the path at most every check_interval seconds
+and remap when the inode changes; a mapping already in use stays valid
+until its last reader drops it.
+
+Layout (little-endian):
+
+    header    HEADER
+    teams     team_count   x TEAM_RECORD
+    players   player_count x PLAYER_RECORD, ordered by (-runs, id)
+    by_rate   player_count x uint32 player index, ordered by (-strike_rate, id)
+    strings   UTF-8 names and teams, referenced by (offset, length)
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'CRKSNAP1'
+LAYOUT_VERSION = 1
+
+# magic, layout version, generation (ns), created_at, player_count, team_count,
+# strings_offset, strings_size
+HEADER = struct.Struct('<8sIQdIIQQ')
+# name offset, name length, players_count, total_runs, strike_rate_sum
+TEAM_RECORD = struct.Struct('<IIIqd')
+# id, runs, balls, fours, sixes, strike_rate, team index, name offset, name length
+PLAYER_RECORD = struct.Struct('<qqqiidIII')
+RATE_INDEX = struct.Struct('<I')
+
+
+class _Strings:
+    """Builds the strings section, de-duplicating repeated values"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self._offsets = {}
+
+    def add(self, value):
+        encoded = value.encode('utf-8')
+        offset = self._offsets.get(encoded)
+        if offset is None:
+            offset = self._offsets[encoded] = len(self.data)
+            self.data += encoded
+        return offset, len(encoded)
+
+
+def build_snapshot(conn):
+    """Serialize players and team aggregates into snapshot bytes"""
+    # The generation precedes the read: every write committed before it is included
+    generation = time.time_ns()
+    # One read transaction so players and team_statistics agree
+    conn.execute('BEGIN')
+    try:
+        players = conn.execute('''
+            SELECT id, name, team, runs, balls, fours, sixes, strike_rate
+            FROM players
+            ORDER BY runs DESC, id
+        ''').fetchall()
+        teams = conn.execute('''
+            SELECT team, players_count, total_runs, strike_rate_sum
+            FROM team_statistics
+            ORDER BY team
+        ''').fetchall()
+    finally:
+        conn.rollback()
+
+    strings = _Strings()
+    team_index = {}
+    team_section = bytearray()
+    for team, players_count, total_runs, strike_rate_sum in teams:
+        team_index[team] = len(team_index)
+        team_section += TEAM_RECORD.pack(*strings.add(team), players_count, total_runs,
+                                         strike_rate_sum)
+
+    player_section = bytearray()
+    for player_id, name, team, runs, balls, fours, sixes, strike_rate in players:
+        if team not in team_index:
+            # team_statistics lags only if it was never built; keep the row readable
+            team_index[team] = len(team_index)
+            team_section += TEAM_RECORD.pack(*strings.add(team), 0, 0, 0.0)
+        player_section += PLAYER_RECORD.pack(player_id, runs or 0, balls or 0, fours or 0,
+                                             sixes or 0, float(strike_rate or 0.0),
+                                             team_index[team], *strings.add(name))
+
+    by_rate = sorted(range(len(players)), key=lambda i: (-(players[i][7] or 0.0), players[i][0]))
+    rate_section = b''.join(RATE_INDEX.pack(i) for i in by_rate)
+
+    team_count = len(team_section) // TEAM_RECORD.size
+    strings_offset = HEADER.size + len(team_section) + len(player_section) + len(rate_section)
+    header = HEADER.pack(MAGIC, LAYOUT_VERSION, generation, time.time(), len(players),
+                         team_count, strings_offset, len(strings.data))
+    return b''.join((header, team_section, player_section, rate_section, strings.data))
+
+
+def write_snapshot(conn, path):
+    """Build a snapshot and atomically replace the file at path"""
+    data = build_snapshot(conn)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(data)
+
+
+def snapshot_is_current(path, database):
+    """True if the snapshot file is newer than the database and its WAL"""
+    try:
+        snapshot_mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    for db_file in (database, database + '-wal'):
+        try:
+            if os.stat(db_file).st_mtime_ns > snapshot_mtime:
+                return False
+        except FileNotFoundError:
+            pass
+    return True
+
+
+class _Mapping:
+    """One read-only mapping of a snapshot file with its decoded header"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.inode = (stat.st_dev, stat.st_ino)
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, layout, self.generation, self.created_at, self.player_count, self.team_count,
+         self.strings_offset, strings_size) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            raise ValueError(f'{path} is not a version {LAYOUT_VERSION} analytics snapshot')
+        if self.strings_offset + strings_size != len(self.buffer):
+            raise ValueError(f'{path} is truncated')
+        self.teams_offset = HEADER.size
+        self.players_offset = self.teams_offset + self.team_count * TEAM_RECORD.size
+        self.rate_offset = self.players_offset + self.player_count * PLAYER_RECORD.size
+        self.team_names = [self._string(*TEAM_RECORD.unpack_from(
+            self.buffer, self.teams_offset + i * TEAM_RECORD.size)[:2])
+            for i in range(self.team_count)]
+        self.team_codes = {team: i for i, team in enumerate(self.team_names)}
+
+    def _string(self, offset, length):
+        start = self.strings_offset + offset
+        return str(self.buffer[start:start + length], 'utf-8')
+
+    def player(self, index):
+        (player_id, runs, balls, fours, sixes, strike_rate, team, name_offset,
+         name_length) = PLAYER_RECORD.unpack_from(
+            self.buffer, self.players_offset + index * PLAYER_RECORD.size)
+        return {
+            'id': player_id,
+            'name': self._string(name_offset, name_length),
+            'team': self.team_names[team],
+            'runs': runs,
+            'balls': balls,
+            'fours': fours,
+            'sixes': sixes,
+            'strike_rate': strike_rate,
+        }
+
+    def rate_order(self, position):
+        return RATE_INDEX.unpack_from(self.buffer, self.rate_offset + position * RATE_INDEX.size)[0]
+
+    def top(self, n, team, min_balls, by_rate):
+        code = None
+        if team is not None:
+            code = self.team_codes.get(team)
+            if code is None:
+                return []
+        result = []
+        for position in range(self.player_count):
+            index = self.rate_order(position) if by_rate else position
+            # Filter on the fixed fields before decoding the name
+            _, _, balls, _, _, _, team_code, _, _ = PLAYER_RECORD.unpack_from(
+                self.buffer, self.players_offset + index * PLAYER_RECORD.size)
+            if (code is not None and team_code != code) or balls < min_balls:
+                continue
+            result.append(self.player(index))
+            if len(result) >= n:
+                break
+        return result
+
+    def team_statistics(self):
+        stats = []
+        for i in range(self.team_count):
+            _, _, players_count, total_runs, strike_rate_sum = TEAM_RECORD.unpack_from(
+                self.buffer, self.teams_offset + i * TEAM_RECORD.size)
+            if players_count:
+                stats.append({
+                    'team': self.team_names[i],
+                    'players_count': players_count,
+                    'total_runs': total_runs,
+                    'avg_strike_rate': strike_rate_sum / players_count,
+                })
+        return stats
+
+
+class AnalyticsSnapshot:
+    """Read-only view of the current snapshot file"""
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mapping = None
+        self._checked_at = 0.0
+        self._stats = {'hits': 0, 'misses': 0, 'remaps': 0, 'errors': 0}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Shared read-only pages stay valid in the child; only the lock is reset
+        self._lock = threading.Lock()
+
+    def _current(self):
+        """Mapping of the newest snapshot, remapping if the file was replaced"""
+        now = time.monotonic()
+        with self._lock:
+            mapping = self._mapping
+            if mapping is not None and now - self._checked_at < self.check_interval:
+                return mapping
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                if mapping is None or (stat.st_dev, stat.st_ino) != mapping.inode:
+                    # Readers holding the old mapping keep it alive until they finish
+                    mapping = self._mapping = _Mapping(self.path)
+                    self._stats['remaps'] += 1
+            except FileNotFoundError:
+                mapping = self._mapping = None
+            except (OSError, ValueError, struct.error):
+                self._stats['errors'] += 1
+                mapping = self._mapping = None
+            return mapping
+
+    def _query(self, method, *args):
+        mapping = self._current()
+        if mapping is None:
+            self._stats['misses'] += 1
+            return None
+        self._stats['hits'] += 1
+        return getattr(mapping, method)(*args)
+
+    def as_of(self):
+        """Generation (time_ns() before its read) of the current snapshot, or None"""
+        mapping = self._current()
+        return mapping.generation if mapping is not None else None
+
+    def top_run_scorers(self, n=5, team=None, min_balls=0):
+        """Top n players by runs, or None if there is no snapshot"""
+        return self._query('top', n, team, min_balls, False)
+
+    def top_strike_rates(self, n=5, team=None, min_balls=10):
+        """Top n players by strike rate, or None if there is no snapshot"""
+        return self._query('top', n, team, min_balls, True)
+
+    def team_statistics(self):
+        """Per-team aggregates in the analytics response shape, or None"""
+        return self._query('team_statistics')
+
+    def stats(self):
+        """Return snapshot metadata and counters for monitoring"""
+        mapping = self._current()
+        stats = dict(self._stats)
+        stats['path'] = self.path
+        stats['loaded'] = mapping is not None
+        if mapping is not None:
+            stats.update({
+                'generation': mapping.generation,
+                'age_seconds': round(time.time() - mapping.created_at, 3),
+                'players': mapping.player_count,
+                'teams': mapping.team_count,
+                'bytes': len(mapping.buffer),
+            })
+        return stats
+
+
+class SnapshotWriter:
+    """Debounced background rebuilds of the snapshot after writes"""
+
+    def __init__(self, pool, path, delay=1.0):
+        self.pool = pool
+        self.path = path
+        self.delay = delay
+        self._reset()
+        self._stats = {'builds': 0, 'errors': 0, 'last_build_ms': None, 'last_size': None}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Also runs after fork: a scheduled rebuild thread does not survive it
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def write(self):
+        """Rebuild the snapshot now on a pooled connection"""
+        start = time.perf_counter()
+        try:
+            with self.pool.connection() as conn:
+                size = write_snapshot(conn, self.path)
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+        self._stats['builds'] += 1
+        self._stats['last_build_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        self._stats['last_size'] = size
+        return size
+
+    def mark_dirty(self):
+        """Schedule a rebuild; writes within delay share one rebuild"""
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        def run():
+            time.sleep(self.delay)
+            with self._lock:
+                # Writes from here on schedule the next rebuild
+                self._scheduled = False
+            try:
+                self.write()
+            except Exception:
+                pass
+
+        threading.Thread(target=run, name='snapshot-writer', daemon=True).start()
+
+    def stats(self):
+        """Return writer counters for monitoring"""
+        stats = dict(self._stats)
+        stats['scheduled'] = self._scheduled
+        stats['delay'] = self.delay
+        return stats
@@ -0,0 +1,205 @@
+"""
+Behavioural contract every storage repository must satisfy.
+
+run_contract() exercises a repository through its public methods only and
+returns the failures, so the same checks run against the SQLite and the
+PostgreSQL drivers (`flask check-storage`). Each case works on players and
+matches of its own random team, so it can run against a database that
+already holds data, and removes what it created.
+"""
+import threading
+import traceback
+import uuid
+
+from repository import VersionConflict
+
+
+def _strike_rate(runs, balls):
+    return round((runs / balls) * 100, 2) if balls > 0 else 0.0
+
+
+def _player(team, name='P', runs=0, balls=0):
+    return {'name': name, 'team': team, 'runs': runs, 'balls': balls, 'fours': 0, 'sixes': 0,
+            'strike_rate': _strike_rate(runs, balls)}
+
+
+def _match(team1, team2, status='Upcoming', score1='0-0', score2='0-0', overs='0.0'):
+    return {'team1': team1, 'team2': team2, 'score1': score1, 'score2': score2,
+            'status': status, 'overs': overs, 'venue': 'Contract Oval',
+            'match_date': '2025-01-01'}
+
+
+def _expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def _raises(exception, func, *args, **kwargs):
+    try:
+        func(*args, **kwargs)
+    except exception as e:
+        return e
+    raise AssertionError(f'{func.__name__} did not raise {exception.__name__}')
+
+
+def case_player_round_trip(repo, team, cleanup):
+    created = repo.create_player(_player(team, 'ROUND TRIP', 45, 56))
+    cleanup.append(('player', created['id']))
+    _expect(created['version'] == 1, f"new row version is {created['version']}")
+    _expect(created['strike_rate'] == 80.36, f"strike_rate {created['strike_rate']!r}")
+    _expect(isinstance(created['strike_rate'], float), 'strike_rate is not a float')
+    fetched = repo.get_player(created['id'])
+    _expect(fetched == created, f'get_player {fetched} != create_player {created}')
+    _expect(repo.get_player(created['id'] + 10 ** 9) is None, 'missing player is not None')
+
+
+def case_player_partial_update(repo, team, cleanup):
+    player = repo.create_player(_player(team, 'UPDATE', 10, 20))
+    cleanup.append(('player', player['id']))
+
+    updated, changed = repo.update_player(player['id'], {'runs': 30})
+    _expect(changed, 'runs change reported as unchanged')
+    _expect(updated['runs'] == 30 and updated['balls'] == 20, f'wrong row {updated}')
+    _expect(updated['strike_rate'] == 150.0, f"strike_rate {updated['strike_rate']!r}")
+    _expect(updated['version'] == 2, f"version {updated['version']}")
+
+    same, changed = repo.update_player(player['id'], {'runs': 30})
+    _expect(not changed and same['version'] == 2, 'no-op update wrote the row')
+
+    _raises(LookupError, repo.update_player, player['id'] + 10 ** 9, {'runs': 1})
+
+
+def case_player_if_match(repo, team, cleanup):
+    player = repo.create_player(_player(team, 'IF MATCH', 5, 5))
+    cleanup.append(('player', player['id']))
+
+    conflict = _raises(VersionConflict, repo.update_player, player['id'], {'runs': 6}, [7])
+    _expect(conflict.version == 1, f'conflict reports version {conflict.version}')
+    _expect(repo.get_player(player['id'])['runs'] == 5, 'stale If-Match wrote the row')
+
+    updated, changed = repo.update_player(player['id'], {'runs': 6}, [1])
+    _expect(changed and updated['version'] == 2, 'matching If-Match did not write')
+
+
+def case_player_pagination(repo, team, cleanup):
+    ids = []
+    for i in range(5):
+        ids.append(repo.create_player(_player(team, f'PAGE {i}'))['id'])
+        cleanup.append(('player', ids[-1]))
+
+    # Walk from just above the newest created row so other data is skipped
+    seen, after_id = [], max(ids) + 1
+    while True:
+        page, has_more = repo.list_players(2, after_id)
+        _expect(len(page) <= 2, f'page of {len(page)} rows for limit 2')
+        seen.extend(row['id'] for row in page)
+        if not has_more or not page or page[-1]['id'] <= min(ids):
+            break
+        after_id = page[-1]['id']
+    _expect(seen == sorted(seen, reverse=True), 'pages are not newest-first')
+    _expect(len(seen) == len(set(seen)), 'pages overlap')
+    _expect(set(ids) <= set(seen), 'pagination skipped rows')
+
+
+def case_player_delete(repo, team, cleanup):
+    player = repo.create_player(_player(team, 'DELETE'))
+    deleted = repo.delete_player(player['id'])
+    _expect(deleted is not None and deleted['id'] == player['id'], 'delete did not return row')
+    _expect(repo.get_player(player['id']) is None, 'deleted player still readable')
+    _expect(repo.delete_player(player['id']) is None, 'second delete returned a row')
+
+
+def case_dashboard_queries(repo, team, cleanup):
+    for name, runs, balls in (('LOW', 10, 40), ('HIGH', 90, 60), ('FEW BALLS', 50, 5)):
+        cleanup.append(('player', repo.create_player(_player(team, name, runs, balls))['id']))
+
+    by_runs = repo.top_players('runs', 2, team)
+    _expect([p['name'] for p in by_runs] == ['HIGH', 'FEW BALLS'], f'top runs {by_runs}')
+    by_rate = repo.top_players('strike_rate', 5, team, min_balls=10)
+    _expect([p['name'] for p in by_rate] == ['HIGH', 'LOW'], f'top strike rates {by_rate}')
+    _raises(ValueError, repo.top_players, 'name; DROP TABLE players', 1)
+
+    stats = {row['team']: row for row in repo.team_statistics()}
+    _expect(team in stats, 'team missing from team_statistics')
+    _expect(stats[team]['players_count'] == 3 and stats[team]['total_runs'] == 150,
+            f'wrong team statistics {stats[team]}')
+    expected = (_strike_rate(10, 40) + _strike_rate(90, 60) + _strike_rate(50, 5)) / 3
+    _expect(abs(stats[team]['avg_strike_rate'] - expected) < 1e-6,
+            f"avg_strike_rate {stats[team]['avg_strike_rate']} != {expected}")
+
+
+def case_match_lifecycle(repo, team, cleanup):
+    match = repo.create_match(_match(team, 'OPP', score1='120-3', overs='20.0'))
+    cleanup.append(('match', match['id']))
+    _expect(match['version'] == 1 and match['match_date'] == '2025-01-01', f'wrong row {match}')
+    _expect(repo.get_match(match['id']) == match, 'get_match differs from create_match')
+
+    updated, changed = repo.update_match(match['id'], {'score1': '150-4', 'status': 'Live'})
+    _expect(changed and updated['score1'] == '150-4' and updated['version'] == 2,
+            f'wrong update {updated}')
+    live = repo.live_match()
+    _expect(live is not None and live['status'] == 'Live', f'live_match returned {live}')
+    _expect(live['id'] >= match['id'], 'live_match is not the newest live match')
+
+    _raises(VersionConflict, repo.update_match, match['id'], {'overs': '21.0'}, [1])
+    deleted = repo.delete_match(match['id'])
+    _expect(deleted['id'] == match['id'] and repo.get_match(match['id']) is None,
+            'match not deleted')
+    cleanup.remove(('match', match['id']))
+
+
+def case_concurrent_updates(repo, team, cleanup):
+    players = [repo.create_player(_player(team, f'THREAD {i}')) for i in range(8)]
+    cleanup.extend(('player', player['id']) for player in players)
+    errors = []
+
+    def work(player_id):
+        try:
+            for runs in range(1, 21):
+                repo.update_player(player_id, {'runs': runs, 'balls': runs * 2})
+        except Exception as e:  # collected and reported below
+            errors.append(e)
+
+    # More threads than a small pool has connections, so acquire has to wait
+    threads = [threading.Thread(target=work, args=(player['id'],))
+               for player in players for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _expect(not errors, f'concurrent updates failed: {errors[:3]}')
+    for player in players:
+        final = repo.get_player(player['id'])
+        _expect(final['runs'] == 20 and final['strike_rate'] == 50.0, f'lost update {final}')
+
+
+CONTRACT_CASES = [
+    case_player_round_trip,
+    case_player_partial_update,
+    case_player_if_match,
+    case_player_pagination,
+    case_player_delete,
+    case_dashboard_queries,
+    case_match_lifecycle,
+    case_concurrent_updates,
+]
+
+
+def run_contract(repo):
+    """Run every contract case; returns [(case name, error message)]"""
+    failures = []
+    for case in CONTRACT_CASES:
+        team = f'CT{uuid.uuid4().hex[:8].upper()}'
+        cleanup = []
+        try:
+            case(repo, team, cleanup)
+        except Exception as e:
+            detail = str(e) if isinstance(e, AssertionError) else traceback.format_exc(limit=3)
+            failures.append((case.__name__, detail))
+        finally:
+            for kind, row_id in cleanup:
+                if kind == 'player':
+                    repo.delete_player(row_id)
+                else:
+                    repo.delete_match(row_id)
+    return failures
@@ -0,0 +1,62 @@
+"""
+Materialized per-team player aggregates.
+
+team_statistics holds players_count, total_runs and the strike rate sum per
+team and is kept current by SQLite triggers on players (created by the
+initial_schema migration), so the analytics endpoint reads one row per team
+instead of scanning every player.
+avg_strike_rate is derived as strike_rate_sum / players_count on read.
+"""
+import math
+
+RECOMPUTE_SQL = '''
+    SELECT team,
+           COUNT(*) as players_count,
+           SUM(runs) as total_runs,
+           SUM(strike_rate) as strike_rate_sum
+    FROM players
+    GROUP BY team
+'''
+
+READ_SQL = '''
+    SELECT team, players_count, total_runs,
+           strike_rate_sum / players_count as avg_strike_rate
+    FROM team_statistics
+    ORDER BY team
+'''
+
+# Incremental strike rate sums may drift from a recompute by float error only
+STRIKE_RATE_REL_TOLERANCE = 1e-9
+STRIKE_RATE_ABS_TOLERANCE = 1e-6
+
+
+def rebuild_team_stats(conn):
+    """Recompute team_statistics from players"""
+    conn.execute('DELETE FROM team_statistics')
+    conn.execute(f'''
+        INSERT INTO team_statistics (team, players_count, total_runs, strike_rate_sum)
+        {RECOMPUTE_SQL}
+    ''')
+
+
+def read_team_stats(conn):
+    """Return team statistics rows in the analytics response shape"""
+    rows = conn.execute(READ_SQL).fetchall()
+    return [dict(row) for row in rows]
+
+
+def check_team_stats(conn):
+    """Compare team_statistics with a full recompute; return mismatches"""
+    expected = {row[0]: tuple(row[1:]) for row in conn.execute(RECOMPUTE_SQL)}
+    actual = {row[0]: tuple(row[1:]) for row in conn.execute(
+        'SELECT team, players_count, total_runs, strike_rate_sum FROM team_statistics'
+    )}
+
+    mismatches = []
+    for team in sorted(set(expected) | set(actual)):
+        want, got = expected.get(team), actual.get(team)
+        if want is None or got is None or want[:2] != got[:2] or not math.isclose(
+                want[2], got[2], rel_tol=STRIKE_RATE_REL_TOLERANCE,
+                abs_tol=STRIKE_RATE_ABS_TOLERANCE):
+            mismatches.append({'team': team, 'expected': want, 'actual': got})
+    return mismatches
@@ -0,0 +1,159 @@
+"""
+Group-commit write queue for high-frequency live score updates.
+
+Updates are submitted as (table, row id, changed columns) and applied by a
+single background writer thread. Repeated updates to the same row that
+arrive before the next flush are merged (later values win), and each flush
+applies the whole batch in one transaction with one commit. submit()
+returns a Future that resolves once the batch is committed, so callers can
+either wait for durability or return immediately.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    """Single-writer queue that merges and batch-commits row updates"""
+
+    def __init__(self, pool, apply, after_commit=None, max_batch=500, interval=0.01):
+        self.pool = pool
+        self.apply = apply
+        self.after_commit = after_commit
+        self.max_batch = max_batch
+        self.interval = interval
+        self._reset()
+        self._stats = {
+            'submitted': 0,
+            'merged': 0,
+            'rows_written': 0,
+            'batches': 0,
+            'errors': 0,
+        }
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Also runs after fork: the writer thread does not survive it
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._thread = None
+        self._pid = os.getpid()
+        self._stopping = False
+
+    def _ensure_started(self):
+        # Restart a writer that exited after stop() or died
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+            self._thread.start()
+
+    def submit(self, table, row_id, changes):
+        """Queue a partial update; the Future resolves to the committed row"""
+        future = Future()
+        with self._cond:
+            self._ensure_started()
+            key = (table, row_id)
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = {'changes': dict(changes), 'futures': [future]}
+            else:
+                entry['changes'].update(changes)
+                entry['futures'].append(future)
+                self._stats['merged'] += 1
+            self._stats['submitted'] += 1
+            self._cond.notify()
+        return future
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._stopping:
+                self._cond.wait()
+            # Give concurrent writers one interval to join this batch
+            deadline = time.monotonic() + self.interval
+            while len(self._pending) < self.max_batch and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending, {}
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+            elif self._stopping:
+                return
+
+    def _flush(self, batch):
+        results = {}
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                for (table, row_id), entry in batch.items():
+                    # A savepoint per row keeps one bad update from failing the batch
+                    conn.execute('SAVEPOINT queued_row')
+                    try:
+                        results[(table, row_id)] = (True, self.apply(conn, table, row_id, entry['changes']))
+                        conn.execute('RELEASE queued_row')
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO queued_row')
+                        conn.execute('RELEASE queued_row')
+                        results[(table, row_id)] = (False, e)
+                        self._stats['errors'] += 1
+                conn.commit()
+        except Exception as e:
+            self._stats['errors'] += 1
+            for entry in batch.values():
+                for future in entry['futures']:
+                    future.set_exception(e)
+            return
+
+        self._stats['batches'] += 1
+        for key, entry in batch.items():
+            ok, result = results[key]
+            if ok:
+                self._stats['rows_written'] += 1
+                if self.after_commit:
+                    # The row is committed; a failing callback is still
+                    # reported to this row's callers and not the batch
+                    try:
+                        self.after_commit(key[0], result)
+                    except Exception as e:
+                        ok, result = False, e
+                        self._stats['errors'] += 1
+            for future in entry['futures']:
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+
+    def stop(self, timeout=5.0):
+        """Flush outstanding updates and stop the writer thread
+
+        Registered with atexit by the app, and called from gunicorn's
+        worker_exit hook, so queued updates are committed on shutdown.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        """Return queue counters for monitoring"""
+        with self._cond:
+            pending = len(self._pending)
+        stats = dict(self._stats)
+        stats.update({
+            'pending': pending,
+            'max_batch': self.max_batch,
+            'interval': self.interval,
+            'running': self._thread is not None and self._thread.is_alive(),
+        })
+        return stats